@@ -1,28 +1,75 @@
 # -------------------- LOAD .ENV FIRST --------------------
+import startup  # starts the startup clock
 from dotenv import load_dotenv
 load_dotenv()  # now all environment variables are available
 
 # -------------------- STANDARD IMPORTS --------------------
-import threading
+import importlib.util
 import os
+import subprocess
+import sys
 
-from webpage import app
-from telegram_bot.runner import run_bot
+# Usage: python main.py [all|web|bot]   (default: RUN_MODE or "all")
+#   web  webpage.app under gunicorn, WEB_WORKERS processes x WEB_THREADS
+#   bot  the Telegram bot and its scheduler
+#   all  both, as two separate processes
+# The processes share nothing but the storage files; every cache checks the
+# file (or SQLite table) signature, so a write in one is seen by the others.
 
 # -------------------- FLASK --------------------
 def run_flask():
+    from webpage import app
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False)
+    app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False,
+            threaded=True)
+
+def run_web():
+    if importlib.util.find_spec("gunicorn") is None:
+        print("gunicorn is not installed, falling back to Flask's server")
+        run_flask()
+        return
+
+    port = int(os.environ.get("PORT", 5000))
+    workers = os.environ.get("WEB_WORKERS", str(min(4, os.cpu_count() or 1)))
+    threads = os.environ.get("WEB_THREADS", "4")
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    print(f"Starting web: gunicorn, {workers} workers x {threads} threads")
+    # Replace this process so signals reach gunicorn directly
+    os.execv(sys.executable, [
+        sys.executable, "-m", "gunicorn",
+        "--workers", workers,
+        "--threads", threads,
+        "--bind", f"0.0.0.0:{port}",
+        "--pythonpath", here,
+        "webpage:app"
+    ])
+
+# -------------------- TELEGRAM --------------------
+def run_bot():
+    from telegram_bot.runner import run_bot as start
+    return start()
+
+def run_all():
+    web = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "web"])
+    try:
+        # Blocks until the bot stops; returns False at once without BOT_TOKEN
+        if run_bot() is False:
+            web.wait()
+    finally:
+        web.terminate()
+        web.wait()
 
 # ==========================
 # RUN
 # ==========================
-if __name__ == "__main__":
-    print("Starting Flask web and Telegram bot")
+MODES = {"all": run_all, "web": run_web, "bot": run_bot}
 
-    flask_thread = threading.Thread(target=run_flask)
-    flask_thread.daemon = True
-    flask_thread.start()
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("RUN_MODE", "all")
+    if mode not in MODES:
+        sys.exit(f"Unknown mode {mode!r}, expected one of: {', '.join(MODES)}")
 
-    # Start Telegram bot (blocks forever)
-    run_bot()
\ No newline at end of file
+    print(f"Starting {mode}")
+    MODES[mode]()
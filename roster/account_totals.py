@@ -0,0 +1,92 @@
+# account_totals.py
+import atexit
+import os
+import threading
+import time
+
+from storage.locks import EXCLUSIVE, file_lock
+
+
+class AccountTotalsWorker:
+    """Coalesces "these students' totals changed" events into batches.
+
+    Routes call mark_dirty() and return immediately; a background thread
+    hands everything marked during the last `interval` seconds to
+    `recompute(user_ids)` in one call. Pages that must show exact totals
+    call flush() first. With interval <= 0 every mark recomputes inline.
+
+    The marked ids live in `dirty_file` (one per line), not in memory, so
+    a flush() in any worker process also picks up the marks of the others.
+    A recompute that fails leaves its ids in the file; the next flush()
+    (the thread's, or the one of the next mark with interval <= 0) retries
+    them.
+    """
+
+    def __init__(self, recompute, dirty_file, interval=5.0):
+        self._recompute = recompute
+        self.dirty_file = dirty_file
+        self.interval = interval
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def mark_dirty(self, *user_ids):
+        ids = {str(u).strip() for u in user_ids if str(u).strip()}
+        if not ids:
+            return
+        with file_lock(self.dirty_file, EXCLUSIVE):
+            with open(self.dirty_file, "a", encoding="utf-8") as f:
+                f.writelines(f"{uid}\n" for uid in sorted(ids))
+        if self.interval <= 0:
+            self.flush()
+            return
+        self._ensure_thread()
+
+    def pending(self):
+        with file_lock(self.dirty_file, EXCLUSIVE):
+            return self._read()
+
+    def flush(self):
+        """Recompute everything marked so far, in the calling thread."""
+        # One recompute at a time across all processes: a flush() that
+        # finds the file empty while another one is still writing the
+        # totals waits for it, instead of showing the old ones
+        with file_lock(self.dirty_file + ".flush", EXCLUSIVE):
+            with file_lock(self.dirty_file, EXCLUSIVE):
+                ids = self._read()
+                self._clear()
+            if not ids:
+                return
+            try:
+                self._recompute(sorted(ids))
+            except Exception as e:
+                print(f"[AccountTotalsWorker] Recompute failed, will retry: {e}")
+                with file_lock(self.dirty_file, EXCLUSIVE):
+                    with open(self.dirty_file, "a", encoding="utf-8") as f:
+                        f.writelines(f"{uid}\n" for uid in sorted(ids))
+
+    def _read(self):
+        try:
+            with open(self.dirty_file, encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def _clear(self):
+        try:
+            os.remove(self.dirty_file)
+        except FileNotFoundError:
+            pass
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop,
+                                                name="account-totals",
+                                                daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
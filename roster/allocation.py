@@ -0,0 +1,343 @@
+# allocation.py
+import heapq
+from collections import deque
+
+from startup import lazy_import
+
+from .eligibility import eligibility_matrix
+
+pd = lazy_import("pandas")
+
+_INF = float("inf")
+
+
+class MinCostFlow:
+    """Minimum-cost maximum flow with integer capacities and costs >= 0.
+
+    Primal-dual: each round finds shortest distances with Dijkstra (on
+    reduced costs, so potentials keep them non-negative), then pushes a
+    blocking flow along every shortest path at once. The number of rounds
+    is bounded by the number of distinct path costs, which stays small for
+    the allocation graph, so hundreds of coaches by a month of slots
+    solves in well under a second.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        # Edge e: to[e], cap[e], cost[e]; its reverse is e ^ 1
+        self.to, self.cap, self.cost = [], [], []
+        self.adj = [[] for _ in range(n)]
+
+    def add_edge(self, u, v, cap, cost):
+        """Edge u -> v; returns its id, for flow_on()."""
+        e = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.adj[u].append(e)
+        self.adj[v].append(e + 1)
+        return e
+
+    def flow_on(self, e):
+        return self.cap[e ^ 1]
+
+    def solve(self, s, t):
+        """Push as much flow as possible from s to t at minimum cost.
+
+        Returns (flow, cost).
+        """
+        to, cap, cost, adj = self.to, self.cap, self.cost, self.adj
+        h = [0] * self.n  # potentials
+        total_flow = total_cost = 0
+
+        while True:
+            # --- Shortest distances on reduced costs ---
+            dist = [_INF] * self.n
+            dist[s] = 0
+            heap = [(0, s)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                hu = h[u]
+                for e in adj[u]:
+                    if cap[e]:
+                        v = to[e]
+                        nd = d + cost[e] + hu - h[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            heapq.heappush(heap, (nd, v))
+            if dist[t] == _INF:
+                return total_flow, total_cost
+            for v in range(self.n):
+                if dist[v] < _INF:
+                    h[v] += dist[v]
+
+            # --- Blocking flows over the zero reduced-cost edges ---
+            while True:
+                level = self._levels(s, t, h)
+                if level[t] < 0:
+                    break
+                it = [0] * self.n
+                while True:
+                    pushed = self._push(s, t, level, it, h)
+                    if not pushed:
+                        break
+                    total_flow += pushed
+                    total_cost += pushed * (h[t] - h[s])
+
+    def _admissible(self, e, u, h):
+        v = self.to[e]
+        return self.cap[e] > 0 and self.cost[e] + h[u] - h[v] == 0
+
+    def _levels(self, s, t, h):
+        level = [-1] * self.n
+        level[s] = 0
+        queue = deque([s])
+        while queue:
+            u = queue.popleft()
+            for e in self.adj[u]:
+                v = self.to[e]
+                if level[v] < 0 and self._admissible(e, u, h):
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level
+
+    def _push(self, s, t, level, it, h):
+        # Iterative DFS along the level graph, advancing edge pointers
+        path = []
+        u = s
+        while True:
+            if u == t:
+                pushed = min(self.cap[e] for e in path)
+                for e in path:
+                    self.cap[e] -= pushed
+                    self.cap[e ^ 1] += pushed
+                return pushed
+            edges = self.adj[u]
+            while it[u] < len(edges):
+                e = edges[it[u]]
+                v = self.to[e]
+                if level[v] == level[u] + 1 and self._admissible(e, u, h):
+                    break
+                it[u] += 1
+            else:
+                # Dead end: drop u from the level graph and back up
+                level[u] = -1
+                if not path:
+                    return 0
+                e = path.pop()
+                u = self.to[e ^ 1]
+                it[u] += 1
+                continue
+            path.append(e)
+            u = self.to[e]
+
+
+def _month_state(slot_df, app_df, accounts, year, month, capacity):
+    """The month's data as both propose_allocation() and check_allocation()
+    work on it.
+
+    Returns (approved_totals, pending, open_slots, busy, eligible):
+    approved totals per coach ID, the pending applications of coaches with
+    an account, {slot key: (free positions, slot row)} of the open slots
+    with room left, the (ID, date, period) already approved, and
+    eligible(ID, slot key).
+    """
+    slots = slot_df.copy()
+    slots.columns = slots.columns.str.strip().str.lower()
+    apps = app_df.copy()
+    apps.columns = apps.columns.str.strip().str.lower()
+    for col in ["isopen", "onjobtrain", "nightshift"]:
+        if col not in slots.columns:
+            slots[col] = 0
+        slots[col] = pd.to_numeric(slots[col], errors="coerce").fillna(0).astype(int)
+    for col in ["status", "admindecision", "name", "timestamp"]:
+        if col not in apps.columns:
+            apps[col] = ""
+
+    def normalize(df):
+        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+        df["shiftperiod"] = df["shiftperiod"].astype(str).str.strip().str.lower()
+        df["shiftlevel"] = df["shiftlevel"].astype(str).str.strip().str.lower()
+        return df[df["date"].map(lambda d: not pd.isna(d) and
+                                 (d.year, d.month) == (year, month))]
+
+    slots = normalize(slots)
+    apps["id"] = apps["id"].astype(str).str.strip()
+    decision = apps["admindecision"].astype(str).str.strip().str.lower()
+    status = apps["status"].astype(str).str.strip().str.lower()
+
+    # Approved totals straight from the applications, like the account
+    # totals, so a pending recompute does not skew the balance
+    approved_totals = apps.loc[decision == "approved", "id"].value_counts()
+
+    apps = normalize(apps.assign(decision=decision, state=status))
+    approved = apps[apps["decision"] == "approved"]
+    pending = apps[(apps["state"] == "pending") &
+                   ~apps["decision"].isin(["approved", "rejected", "cancel"])]
+
+    # --- Open positions per slot ---
+    slot_key = ["date", "shiftperiod", "shiftlevel"]
+    taken = approved.groupby(slot_key).size()
+    open_slots = {}
+    for slot in slots[slots["isopen"] == 1].to_dict("records"):
+        k = (slot["date"], slot["shiftperiod"], slot["shiftlevel"])
+        free = capacity - int(taken.get(k, 0))
+        if free > 0 and k not in open_slots:
+            open_slots[k] = (free, slot)
+
+    # Coaches already on a (date, period) cannot take another level of it
+    busy = set(zip(approved["id"], approved["date"], approved["shiftperiod"]))
+
+    # --- Eligibility of every applicant for every open slot, at once ---
+    pending = pending[pending["id"].isin(list(accounts))]
+    coach_pos = {sid: i for i, sid in enumerate(pending["id"].unique())}
+    slot_pos = {k: i for i, k in enumerate(open_slots)}
+    matrix = eligibility_matrix(
+        pd.DataFrame([accounts[sid] for sid in coach_pos]),
+        pd.DataFrame([slot for _, slot in open_slots.values()])
+    ).eligible.to_numpy()
+
+    def eligible(sid, k):
+        return bool(matrix[coach_pos[sid], slot_pos[k]])
+
+    return approved_totals, pending, open_slots, busy, eligible
+
+
+def _key(app):
+    d = app["date"].strftime("%Y-%m-%d")
+    return f"{app['id']}_{d}_{app['shiftperiod']}_{app['shiftlevel']}"
+
+
+def propose_allocation(slot_df, app_df, accounts, year, month, capacity):
+    """Pick which pending applications of a month to approve.
+
+    slot_df/app_df: the slot and application workbooks; accounts: {ID:
+    account dict} (build_account_flags()); capacity: coaches per slot.
+    Only applications passing eligibility_matrix() are considered.
+
+    Fills as many open positions as possible and, among those fillings,
+    spreads them so the coaches with the fewest approved shifts get the
+    most: the k-th new shift of a coach who has T approved costs T + k, so
+    the total cost is lowest when the totals end up as even as possible.
+    A coach gets at most one level per date and shift period.
+
+    Returns (assignments, summary); assignments are dicts of the chosen
+    application rows with "key" (as the decision routes expect) and
+    "totalApprovedShift" (before the allocation).
+    """
+    summary = {"open_positions": 0, "candidates": 0, "assigned": 0}
+    if slot_df.empty or app_df.empty:
+        return [], summary
+
+    approved_totals, pending, open_slots, busy, eligible = _month_state(
+        slot_df, app_df, accounts, year, month, capacity)
+
+    # --- Candidate applications ---
+    candidates = []
+    seen = set()
+    for app in pending.to_dict("records"):
+        k = (app["date"], app["shiftperiod"], app["shiftlevel"])
+        if k not in open_slots:
+            continue
+        if (app["id"],) + k in seen or \
+                (app["id"], app["date"], app["shiftperiod"]) in busy:
+            continue
+        if not eligible(app["id"], k):
+            continue
+        seen.add((app["id"],) + k)
+        candidates.append(app)
+
+    summary["open_positions"] = sum(free for free, _ in open_slots.values())
+    summary["candidates"] = len(candidates)
+    if not candidates:
+        return [], summary
+
+    # --- Graph: source -> slot -> coach's (date, period) -> coach -> sink ---
+    node_ids = {}
+
+    def node(name):
+        if name not in node_ids:
+            node_ids[name] = len(node_ids)
+        return node_ids[name]
+
+    source, sink = node("source"), node("sink")
+    edges = []  # (u, v, cap, cost)
+    for k, (free, _) in open_slots.items():
+        edges.append((source, node(("slot",) + k), free, 0))
+
+    per_coach = {}
+    for app in candidates:
+        sid = app["id"]
+        turn = node(("turn", sid, app["date"], app["shiftperiod"]))
+        app["_edge"] = len(edges)
+        edges.append((node(("slot", app["date"], app["shiftperiod"],
+                            app["shiftlevel"])), turn, 1, 0))
+        per_coach.setdefault(sid, set()).add(turn)
+
+    for sid, turns in per_coach.items():
+        coach = node(("coach", sid))
+        for turn in turns:
+            edges.append((turn, coach, 1, 0))
+        # One unit edge per possible new shift, each dearer than the last
+        total = int(approved_totals.get(sid, 0))
+        for k in range(len(turns)):
+            edges.append((coach, sink, 1, total + k))
+
+    graph = MinCostFlow(len(node_ids))
+    ids = [graph.add_edge(*e) for e in edges]
+    graph.solve(source, sink)
+
+    assignments = []
+    for app in candidates:
+        if graph.flow_on(ids[app["_edge"]]):
+            assignments.append({
+                "key": _key(app),
+                "id": app["id"],
+                "name": str(app["name"]),
+                "date": app["date"].strftime("%Y-%m-%d"),
+                "shiftperiod": app["shiftperiod"],
+                "shiftlevel": app["shiftlevel"],
+                "totalApprovedShift": int(approved_totals.get(app["id"], 0))
+            })
+    assignments.sort(key=lambda a: (a["date"], a["shiftperiod"], a["shiftlevel"]))
+    summary["assigned"] = len(assignments)
+    return assignments, summary
+
+
+def check_allocation(slot_df, app_df, accounts, year, month, capacity, keys):
+    """Which of a previewed allocation's keys may still be approved.
+
+    keys: the "key"s of propose_allocation()'s assignments. A key stays
+    valid while its application is still pending, its coach still
+    eligible and not yet on that date and period, and its slot still open
+    with a position left (counting the keys accepted before it).
+
+    Returns (valid keys, stale keys), both in the order given.
+    """
+    keys = list(dict.fromkeys(keys))
+    if slot_df.empty or app_df.empty:
+        return [], keys
+
+    _, pending, open_slots, busy, eligible = _month_state(
+        slot_df, app_df, accounts, year, month, capacity)
+    waiting = {_key(app): app for app in pending.to_dict("records")}
+
+    valid, stale = [], []
+    used = {}
+    for key in keys:
+        app = waiting.get(key)
+        if app is None:
+            stale.append(key)
+            continue
+        k = (app["date"], app["shiftperiod"], app["shiftlevel"])
+        turn = (app["id"], app["date"], app["shiftperiod"])
+        if k not in open_slots or used.get(k, 0) >= open_slots[k][0] or \
+                turn in busy or not eligible(app["id"], k):
+            stale.append(key)
+            continue
+        used[k] = used.get(k, 0) + 1
+        busy.add(turn)
+        valid.append(key)
+    return valid, stale
@@ -0,0 +1,62 @@
+# append_index.py
+import threading
+
+from storage.cache import workbook_cache
+from storage.excel_io import append_excel_rows, load_excel_safe
+
+_UNREAD = object()
+
+
+class AppendIndex:
+    """An index over an append-only workbook, kept up to date in place.
+
+        verified = AppendIndex(VERIFY_FILE, build_verified_keys, add_verified_key)
+
+    build(df) makes the index from the whole workbook, add(index, row)
+    folds in one appended row. The workbook is read once; after that
+    append() adds rows to both the workbook and the index without reading
+    it again. A write made anywhere else (another process, the Excel
+    manager) changes the workbook's signature, and the next get() rebuilds
+    the index from the file.
+    """
+
+    def __init__(self, filepath, build, add):
+        self.filepath = filepath
+        self._build = build
+        self._add = add
+        self._index = None
+        self._signature = _UNREAD
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The current index; shared and updated in place, so only look
+        entries up in it (never iterate it)."""
+        signature = workbook_cache.backend.signature(self.filepath)
+        with self._lock:
+            if signature == self._signature:
+                return self._index
+
+        # Signature taken before the read: a write racing with it leaves a
+        # stale signature behind, so the index is rebuilt next time
+        index = self._build(load_excel_safe(self.filepath))
+        with self._lock:
+            self._index, self._signature = index, signature
+        return index
+
+    def append(self, rows):
+        """append_excel_rows(filepath, rows), then add the rows to the index.
+
+        Call inside excel_transaction(filepath). If the index did not match
+        the workbook just before the append, it is left for get() to
+        rebuild instead.
+        """
+        backend = workbook_cache.backend
+        before = backend.signature(self.filepath)
+        append_excel_rows(self.filepath, rows)
+        after = backend.signature(self.filepath)
+        with self._lock:
+            if self._signature is _UNREAD or self._signature != before:
+                return
+            for row in rows:
+                self._add(self._index, row)
+            self._signature = after
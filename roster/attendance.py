@@ -0,0 +1,92 @@
+# attendance.py
+from startup import lazy_import
+
+from .indexes import shift_key, shift_keys
+
+pd = lazy_import("pandas")
+
+# Clock-in/out are stored as events appended to their own workbook instead
+# of being written into shift_record.xlsx; views merge the two on read
+EVENT_COLUMNS = ["timestamp", "id", "date", "shiftperiod", "shiftlevel",
+                 "action", "time"]
+ACTIONS = ("clockin", "clockout")
+
+
+def _text(values):
+    return values.fillna("").astype(str).str.strip()
+
+
+def build_record_clock_times(rec_df):
+    """{shift_key: {"clockin": str, "clockout": str}} for every shift record.
+
+    Also serves as the "does this shift exist" lookup of the clock route.
+    """
+    keys = shift_keys(rec_df)
+    if not keys:
+        return {}
+    cols = {c.strip().lower(): c for c in rec_df.columns}
+    times = {
+        a: (_text(rec_df[cols[a]]) if a in cols
+            else pd.Series("", index=rec_df.index))
+        for a in ACTIONS
+    }
+    index = {}
+    for key, clockin, clockout in zip(keys, times["clockin"], times["clockout"]):
+        index.setdefault(key, {"clockin": clockin, "clockout": clockout})
+    return index
+
+
+def build_clock_events(event_df):
+    """{shift_key: {action: time}}; the first event of each action wins."""
+    keys = shift_keys(event_df)
+    if not keys:
+        return {}
+    events = {}
+    for key, action, time in zip(keys, _text(event_df["action"]).str.lower(),
+                                 _text(event_df["time"])):
+        if action in ACTIONS and time:
+            events.setdefault(key, {}).setdefault(action, time)
+    return events
+
+
+def add_clock_event(events, row):
+    """Fold one appended event row into build_clock_events()'s dict."""
+    key = shift_key(row["id"], pd.to_datetime(row["date"]).date(),
+                    row["shiftperiod"], row["shiftlevel"])
+    events.setdefault(key, {}).setdefault(row["action"], row["time"])
+
+
+def merge_clock_times(recorded, logged):
+    """Effective {"clockin", "clockout"} of a shift from its record row and
+    its build_clock_events() entry.
+
+    A time already in the record (written before events were kept) wins
+    over an event, as only the first clock-in/out counts.
+    """
+    return {a: recorded.get(a) or logged.get(a, "") for a in ACTIONS}
+
+
+def fold_clock_events(rec_df, events):
+    """rec_df with build_clock_events()'s times filled into its blank
+    clockin/clockout cells, and how many cells were filled.
+
+    Gives the workbook the same times merge_clock_times() shows, so an
+    exported shift_record.xlsx is complete.
+    """
+    keys = shift_keys(rec_df)
+    if not keys or not events:
+        return rec_df, 0
+    rec_df = rec_df.copy()
+    cols = {c.strip().lower(): c for c in rec_df.columns}
+    filled = 0
+    for action in ACTIONS:
+        col = cols.get(action, action)
+        current = (_text(rec_df[col]) if col in rec_df.columns
+                   else pd.Series("", index=rec_df.index))
+        logged = pd.Series([events.get(k, {}).get(action, "") for k in keys],
+                           index=rec_df.index)
+        fill = (current == "") & (logged != "")
+        if fill.any():
+            rec_df[col] = current.where(~fill, logged).astype(object)
+            filled += int(fill.sum())
+    return rec_df, filled
@@ -0,0 +1,61 @@
+# eligibility.py
+from collections import namedtuple
+
+from startup import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Who may book a slot, by the slot's (onjobtrain, nightshift) flags:
+#   OJT only      -> coaches with OJT
+#   night only    -> coaches with night eligibility
+#   OJT and night -> coaches with either
+#   neither       -> everyone
+# The one place these rules live; the booking page, booking validation and
+# the auto-allocation all ask eligibility_matrix().
+OJT_REQUIRED = "OJT required"
+NIGHT_REQUIRED = "Night shift eligibility required"
+OJT_OR_NIGHT_REQUIRED = "OJT or Night shift required"
+
+# eligible: bool DataFrame, users x slots; reasons: same shape, "" where
+# eligible, else why not
+Eligibility = namedtuple("Eligibility", ["eligible", "reasons"])
+
+
+def _flags(df, column):
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return pd.to_numeric(df[column], errors="coerce").fillna(0).to_numpy() == 1
+
+
+def eligibility_matrix(users, slots):
+    """Every user against every slot, in one vectorized pass.
+
+    users: one row per coach with "onjobtrain" and "nightShift" (e.g.
+    accounts indexed by ID); slots: one row per slot with "onjobtrain" and
+    "nightshift". The result is indexed by users.index and columned by
+    slots.index.
+    """
+    user_ojt = _flags(users, "onjobtrain")[:, None]
+    user_night = _flags(users, "nightShift")[:, None]
+    slot_ojt = _flags(slots, "onjobtrain")
+    slot_night = _flags(slots, "nightshift")
+
+    ojt_only = slot_ojt & ~slot_night
+    night_only = slot_night & ~slot_ojt
+    either = slot_ojt & slot_night
+
+    eligible = ~((ojt_only & ~user_ojt) |
+                 (night_only & ~user_night) |
+                 (either & ~user_ojt & ~user_night))
+
+    # A slot can only be refused for one reason, whoever asks
+    slot_reason = np.select([ojt_only, night_only, either],
+                            [OJT_REQUIRED, NIGHT_REQUIRED, OJT_OR_NIGHT_REQUIRED],
+                            default="").astype(object)
+    reasons = np.where(eligible, "", slot_reason[None, :])
+
+    return Eligibility(
+        pd.DataFrame(eligible, index=users.index, columns=slots.index),
+        pd.DataFrame(reasons, index=users.index, columns=slots.index))
+
@@ -0,0 +1,214 @@
+# indexes.py
+from startup import lazy_import
+
+from .month_calendar import group_by_date
+
+pd = lazy_import("pandas")
+
+
+def shift_key(student_id, shift_date, shiftperiod, shiftlevel):
+    """Normalized (id, date, shiftperiod, shiftlevel) lookup key."""
+    return (str(student_id).strip(), shift_date,
+            str(shiftperiod).strip().lower(), str(shiftlevel).strip().lower())
+
+
+def shift_keys(df, id_col="id"):
+    """shift_key() of every row of a shift DataFrame, in row order."""
+    cols = {c.strip().lower(): c for c in df.columns}
+    if df.empty or not {id_col, "date", "shiftperiod", "shiftlevel"} <= set(cols):
+        return []
+    ids = df[cols[id_col]].astype(str).str.strip()
+    dates = pd.to_datetime(df[cols["date"]], errors="coerce").dt.date
+    periods = df[cols["shiftperiod"]].fillna("").astype(str).str.strip().str.lower()
+    levels = df[cols["shiftlevel"]].fillna("").astype(str).str.strip().str.lower()
+    return list(zip(ids, dates, periods, levels))
+
+
+def build_application_index(app_df):
+    """{shift_key: status} for every application; the first row of a key wins."""
+    keys = shift_keys(app_df)
+    if not keys:
+        return {}
+    status_col = next((c for c in app_df.columns if c.strip().lower() == "status"),
+                      None)
+    statuses = (app_df[status_col].fillna("").astype(str).str.strip().str.lower()
+                if status_col is not None else [""] * len(keys))
+    index = {}
+    for key, status in zip(keys, statuses):
+        index.setdefault(key, status)
+    return index
+
+
+def build_record_index(rec_df):
+    """frozenset of shift_key for every shift record."""
+    return frozenset(shift_keys(rec_df))
+
+
+def build_applications_by_student(app_df):
+    """{student id: [(date, shiftperiod, shiftlevel), ...]} as stored."""
+    cols = {c.strip().lower(): c for c in app_df.columns}
+    if app_df.empty or not {"id", "date", "shiftperiod", "shiftlevel"} <= set(cols):
+        return {}
+    ids = app_df[cols["id"]].astype(str).str.strip()
+    dates = pd.to_datetime(app_df[cols["date"]], errors="coerce").dt.date
+    by_student = {}
+    for sid, d, period, level in zip(ids, dates, app_df[cols["shiftperiod"]],
+                                     app_df[cols["shiftlevel"]]):
+        if pd.isna(d):
+            continue
+        by_student.setdefault(sid, []).append((d, period, level))
+    return by_student
+
+
+def _cell(value):
+    """A cell as plain JSON: NaN/NaT -> "", numpy scalars -> Python."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def build_applications_by_month(app_df):
+    """{(year, month): [row dict, ...]} of every application, in file order.
+
+    Each row holds what the admin table shows, ready for JSON, so a page of
+    one month is served without touching the DataFrame.
+    """
+    cols = {c.strip().lower(): c for c in app_df.columns}
+    if app_df.empty or not {"id", "date"} <= set(cols):
+        return {}
+
+    def column(name):
+        if name in cols:
+            return app_df[cols[name]].map(_cell)
+        return pd.Series("", index=app_df.index)
+
+    dates = pd.to_datetime(app_df[cols["date"]], errors="coerce")
+    # Timestamps come in several formats; parse each one on its own
+    stamps = pd.to_datetime(column("timestamp").replace("", None),
+                            errors="coerce", format="mixed")
+    frame = pd.DataFrame({
+        "id": app_df[cols["id"]].astype(str).str.strip(),
+        "name": column("name").astype(str),
+        "date": dates.dt.strftime("%Y-%m-%d"),
+        "day": dates.dt.strftime("%A"),
+        "shiftperiod": column("shiftperiod").astype(str),
+        "shiftlevel": column("shiftlevel").astype(str),
+        "status": column("status").astype(str),
+        "admindecision": column("admindecision").astype(str),
+        "adminremarks": column("adminremarks").astype(str),
+        "cancelrequest": column("cancelrequest"),
+        "timestamp": stamps.dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
+    })
+    frame["key"] = (frame["id"] + "_" + frame["date"] + "_" +
+                    frame["shiftperiod"] + "_" + frame["shiftlevel"])
+
+    by_month = {}
+    for (year, month), row in zip(zip(dates.dt.year, dates.dt.month),
+                                  frame.to_dict("records")):
+        if pd.isna(year):
+            continue
+        by_month.setdefault((int(year), int(month)), []).append(row)
+    return by_month
+
+
+def build_account_flags(acc_df):
+    """{ID: {"onjobtrain", "nightShift", "totalApprovedShift", "totalPendingShift"}}."""
+    if acc_df.empty or "ID" not in acc_df.columns:
+        return {}
+    flags = {}
+    fields = ["onjobtrain", "nightShift", "totalApprovedShift", "totalPendingShift"]
+    values = {
+        f: (pd.to_numeric(acc_df[f], errors="coerce").fillna(0).astype(int)
+            if f in acc_df.columns else pd.Series(0, index=acc_df.index))
+        for f in fields
+    }
+    for pos, sid in enumerate(acc_df["ID"].astype(str).str.strip()):
+        flags.setdefault(sid, {f: int(values[f].iloc[pos]) for f in fields})
+    return flags
+
+
+def build_records_by_month(rec_df):
+    """{(year, month): [row dict, ...]} of every shift record, by date.
+
+    Rows carry what the verify page shows plus "key", the form value the
+    verify save expects, and "shift_key" for the verified-key lookup.
+    """
+    cols = {c.strip().lower(): c for c in rec_df.columns}
+    if rec_df.empty or not {"id", "date", "shiftperiod", "shiftlevel"} <= set(cols):
+        return {}
+
+    def column(name):
+        if name in cols:
+            return rec_df[cols[name]].map(_cell).astype(str)
+        return pd.Series("", index=rec_df.index)
+
+    dates = pd.to_datetime(rec_df[cols["date"]], errors="coerce")
+    frame = pd.DataFrame({
+        "id": rec_df[cols["id"]].astype(str),
+        "name": column("name"),
+        "date": dates.dt.strftime("%Y-%m-%d"),
+        "day": column("day"),
+        "shiftperiod": rec_df[cols["shiftperiod"]].astype(str),
+        "shiftlevel": rec_df[cols["shiftlevel"]].astype(str),
+        "clockin": column("clockin"),
+        "clockout": column("clockout")
+    })
+    # Same string the save route splits back into id, date, shift, level
+    frame["key"] = (frame["id"] + "_" + frame["date"] + "_" +
+                    frame["shiftperiod"] + "_" + frame["shiftlevel"])
+    frame["shift_key"] = shift_keys(rec_df)
+    frame = frame[dates.notna()].sort_values("date", kind="stable")
+
+    by_month = {}
+    for year, month, row in zip(frame["date"].str[:4].astype(int),
+                                frame["date"].str[5:7].astype(int),
+                                frame.to_dict("records")):
+        by_month.setdefault((year, month), []).append(row)
+    return by_month
+
+
+def build_verified_keys(verify_df):
+    """set of shift_key for every row of the verify workbook."""
+    return set(shift_keys(verify_df, id_col="studentcoachid"))
+
+
+def add_verified_key(keys, row):
+    """Fold one appended verify row into build_verified_keys()'s set."""
+    keys.add(shift_key(row["studentcoachid"],
+                       pd.to_datetime(row["date"]).date(),
+                       row["shiftperiod"], row["shiftlevel"]))
+
+
+def build_approved_by_month(app_df):
+    """{(year, month): {"YYYY-MM-DD": [shift dict, ...]}} of approved shifts.
+
+    What the public duty calendar shows, grouped once per file version.
+    """
+    cols = {c.strip(): c for c in app_df.columns}
+    if app_df.empty or "date" not in cols:
+        return {}
+
+    def column(name):
+        if name in cols:
+            return app_df[cols[name]].astype(str)
+        return pd.Series("", index=app_df.index)
+
+    # Approved only (case-insensitive)
+    approved = column("admindecision").str.lower() == "approved"
+    dates = pd.to_datetime(app_df[cols["date"]], errors="coerce")
+    df = pd.DataFrame({
+        "date": dates,
+        "name": column("name"),
+        "shiftperiod": column("shiftperiod").str.lower(),
+        "shiftlevel": column("shiftlevel").str.lower(),
+        "adminremarks": column("adminremarks")
+    })[approved & dates.notna()]
+
+    by_month = {}
+    for (year, month), rows in df.groupby([df["date"].dt.year,
+                                            df["date"].dt.month], sort=False):
+        by_month[(int(year), int(month))] = dict(
+            group_by_date(rows, key_format="%Y-%m-%d"))
+    return by_month
@@ -0,0 +1,49 @@
+# month_calendar.py
+import calendar
+from collections import defaultdict
+
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
+
+def month_grid(year, month):
+    """Monday-first weeks of the month as lists of 7 dates."""
+    cal = calendar.Calendar(firstweekday=calendar.MONDAY)
+    return cal.monthdatescalendar(year, month)
+
+
+def group_by_date(df, column="date", key_format=None):
+    """Rows of df as dicts, grouped by the calendar day of df[column].
+
+    Keys are datetime.date objects, or strings when key_format is given
+    (e.g. "%Y-%m-%d"). Rows without a valid date are left out. Built in a
+    single pass, so a calendar can look each day up instead of filtering
+    the whole frame for every cell.
+    """
+    grouped = defaultdict(list)
+    if df.empty or column not in df.columns:
+        return grouped
+
+    days = pd.to_datetime(df[column], errors="coerce")
+    valid = days.notna().to_numpy()
+    if key_format:
+        keys = days.dt.strftime(key_format)
+    else:
+        keys = days.dt.date
+
+    for key, row, ok in zip(keys, df.to_dict("records"), valid):
+        if ok:
+            grouped[key].append(row)
+    return grouped
+
+
+def month_weeks(year, month, shifts_by_date):
+    """month_grid() with each day as {"date": d, "shifts": [...]}.
+
+    Days outside the month get no shifts.
+    """
+    return [[{
+        "date": d,
+        "shifts": shifts_by_date.get(d, []) if d.month == month else []
+    } for d in week] for week in month_grid(year, month)]
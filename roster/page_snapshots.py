@@ -0,0 +1,66 @@
+# page_snapshots.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+# body: rendered HTML; etag: hash of body; last_modified: aware UTC
+# datetime of the last time body actually changed
+Snapshot = namedtuple("Snapshot", ["body", "etag", "last_modified"])
+
+
+class PageSnapshots:
+    """Rendered pages, kept per key until their data version changes.
+
+    get() returns the stored Snapshot while `version` is unchanged and
+    re-renders otherwise. The ETag is a hash of the body and Last-Modified
+    only moves when the body really changes, so a re-render after an
+    unrelated write still lets clients revalidate with a 304.
+
+    With static_dir set, every new body is also written there as a plain
+    HTML file, for displays that can poll a static URL instead.
+    """
+
+    def __init__(self, static_dir=None, max_entries=24):
+        self.static_dir = static_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, Snapshot)
+        self._lock = threading.Lock()
+
+    def get(self, key, version, render, filename=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        body = render()
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        changed = entry is None or entry[1].etag != etag
+        snapshot = Snapshot(
+            body, etag,
+            datetime.now(timezone.utc).replace(microsecond=0)
+            if changed else entry[1].last_modified)
+
+        with self._lock:
+            self._entries[key] = (version, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if changed and self.static_dir and filename:
+            self._write_static(filename, body)
+        return snapshot
+
+    def _write_static(self, filename, body):
+        # Written aside and renamed so a display never reads half a page
+        path = os.path.join(self.static_dir, filename)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.static_dir, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[PageSnapshots] Could not write {path}: {e}")
@@ -0,0 +1,48 @@
+# slots.py
+import calendar
+
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
+SHIFT_PERIODS = ["Morning", "Afternoon", "Night"]
+SHIFT_LEVELS = ["L3", "L4", "L6"]
+
+
+def default_month_slots(year, month):
+    """Every (date, period, level) slot of a month with default settings."""
+    days = pd.date_range(pd.Timestamp(year, month, 1),
+                         periods=calendar.monthrange(year, month)[1])
+    grid = pd.MultiIndex.from_product(
+        [days, SHIFT_PERIODS, SHIFT_LEVELS],
+        names=["date", "shiftperiod", "shiftlevel"]).to_frame(index=False)
+
+    grid.insert(0, "month", f"{year}-{month:02d}")
+    grid.insert(2, "day", grid["date"].dt.strftime("%A"))
+    grid["approvedshift"] = 0
+    grid["isopen"] = 0
+    grid["remarks"] = ""
+    grid["onjobtrain"] = 0
+    grid["nightshift"] = (grid["shiftperiod"] == "Night").astype(int)
+    return grid
+
+
+def missing_month_slots(slot_df, year, month):
+    """Default slots of the month that slot_df does not have yet.
+
+    slot_df needs "date" (datetime64), "shiftperiod" and "shiftlevel"
+    columns; rows of other months are ignored.
+    """
+    grid = default_month_slots(year, month)
+    if slot_df.empty:
+        return grid
+
+    existing = slot_df[["date", "shiftperiod",
+                        "shiftlevel"]].dropna().drop_duplicates()
+    existing = existing.assign(date=pd.to_datetime(existing["date"]).dt.normalize())
+    merged = grid.merge(existing,
+                        on=["date", "shiftperiod", "shiftlevel"],
+                        how="left",
+                        indicator=True)
+    return merged[merged["_merge"] == "left_only"].drop(
+        columns="_merge").reset_index(drop=True)
@@ -0,0 +1,66 @@
+# startup.py
+import importlib
+import threading
+import time
+
+# Import of this module ~ process start (main.py and webpage.py import it first)
+_started = time.perf_counter()
+_phases = []  # (name, ms since start)
+_loaded = {}  # module name -> ms its deferred import took
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Stand-in for a heavy module, imported on first attribute access.
+
+        pd = lazy_import("pandas")   # nothing imported yet
+        pd.DataFrame()               # pandas is imported here
+
+    Lets webpage.py and the bot start (and answer /health) without paying
+    for pandas/numpy until a request actually needs them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    # Several modules share one import; keep the first, real cost
+                    _loaded.setdefault(self._name,
+                                       (time.perf_counter() - start) * 1000)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def mark(phase):
+    """Record that phase finished; printed as part of the startup report."""
+    elapsed = (time.perf_counter() - _started) * 1000
+    with _lock:
+        _phases.append((phase, elapsed))
+    print(f"[startup] {phase} ready in {elapsed:.0f} ms")
+
+
+def report():
+    with _lock:
+        return {
+            "phases_ms": {name: round(ms, 1) for name, ms in _phases},
+            "deferred_imports_ms": {name: round(ms, 1)
+                                    for name, ms in _loaded.items()},
+            "uptime_s": round(time.perf_counter() - _started, 1)
+        }
@@ -64,12 +64,154 @@ document.addEventListener("DOMContentLoaded", function() {
         btnTableView.classList.replace("btn-primary", "btn-secondary");
     });
 
+    // ------------------ Table Rows (fetched page by page) ------------------
+    const tableBody = document.querySelector("#applicationTable tbody");
+    const pagerInfo = document.getElementById("pagerInfo");
+    const pagerPrev = document.getElementById("pagerPrev");
+    const pagerNext = document.getElementById("pagerNext");
+    const PER_PAGE = 50;
+    let currentPage = 1;
+    let totalPages = 1;
+
+    function cell(text) {
+        const td = document.createElement("td");
+        td.textContent = text ?? "";
+        return td;
+    }
+
+    function decisionSelect(value, className) {
+        const select = document.createElement("select");
+        select.className = className;
+        [["", ""], ["approved", "Approved"], ["rejected", "Rejected"],
+         ["pending", "Pending"], ["cancel", "Cancel"]].forEach(([v, label]) => {
+            const option = new Option(label, v, false, v === value);
+            select.appendChild(option);
+        });
+        return select;
+    }
+
+    function renderRow(app) {
+        const row = document.createElement("tr");
+        Object.assign(row.dataset, {
+            timestamp: app.timestamp,
+            key: app.key,
+            id: app.id,
+            name: app.name.toLowerCase(),
+            date: app.date,
+            shift: app.shiftperiod.toLowerCase(),
+            level: app.shiftlevel.toLowerCase(),
+            status: app.status.toLowerCase(),
+            decision: app.admindecision.toLowerCase(),
+            ojt: app.onjobtrain,
+            night: app.nightShift
+        });
+
+        const selectCell = document.createElement("td");
+        const select = document.createElement("input");
+        select.type = "checkbox";
+        select.className = "form-check-input row-select";
+        selectCell.appendChild(select);
+        row.appendChild(selectCell);
+
+        [app.timestamp, app.id, app.onjobtrain, app.nightShift,
+         app.totalApprovedShift, app.totalPendingShift, app.name, app.date,
+         app.day, app.shiftperiod, app.shiftlevel].forEach(v => row.appendChild(cell(v)));
+
+        const statusCell = document.createElement("td");
+        const badge = document.createElement("span");
+        badge.className = `badge status-badge ${app.status.toLowerCase()}`;
+        badge.textContent = app.status;
+        statusCell.appendChild(badge);
+        row.appendChild(statusCell);
+
+        const decisionCell = document.createElement("td");
+        decisionCell.appendChild(decisionSelect(app.admindecision, "form-select form-select-sm decision-select"));
+        row.appendChild(decisionCell);
+
+        const remarksCell = document.createElement("td");
+        const editBtn = document.createElement("button");
+        editBtn.type = "button";
+        editBtn.className = "btn btn-sm btn-secondary edit-remarks-btn";
+        editBtn.dataset.bsToggle = "modal";
+        editBtn.dataset.bsTarget = "#remarksModal";
+        editBtn.textContent = "Edit";
+        const remarks = document.createElement("span");
+        remarks.className = "admin-remarks-text";
+        remarks.textContent = app.adminremarks;
+        remarksCell.append(editBtn, " ", remarks);
+        row.appendChild(remarksCell);
+
+        row.appendChild(cell(app.cancelrequest));
+
+        const actionCell = document.createElement("td");
+        const saveBtn = document.createElement("button");
+        saveBtn.className = "btn btn-sm btn-primary save-btn";
+        saveBtn.textContent = "Save";
+        actionCell.appendChild(saveBtn);
+        row.appendChild(actionCell);
+
+        return row;
+    }
+
+    function currentFilters() {
+        return {
+            text: filterText.value,
+            date: filterDate.value,
+            shift: filterShift.value,
+            level: filterLevel.value,
+            status: filterStatus.value,
+            decision: filterDecision.value,
+            ojt: filterOJT.value,
+            night: filterNight.value
+        };
+    }
+
+    async function loadPage(page) {
+        const f = currentFilters();
+        const params = new URLSearchParams({
+            month: viewMonth,
+            year: viewYear,
+            page: page,
+            per_page: PER_PAGE,
+            student: f.text,
+            date: f.date,
+            shift: f.shift,
+            level: f.level,
+            status: f.status,
+            decision: f.decision,
+            ojt: f.ojt,
+            night: f.night
+        });
+
+        try {
+            const res = await fetch(`${dataUrl}?${params}`);
+            const data = await res.json();
+            if (!res.ok || !data.success) throw new Error(data.error || "Server error");
+
+            currentPage = data.page;
+            totalPages = data.pages;
+            tableBody.replaceChildren(...data.rows.map(renderRow));
+            updateSelection();
+
+            const first = data.total ? (data.page - 1) * data.per_page + 1 : 0;
+            const last = Math.min(data.page * data.per_page, data.total);
+            pagerInfo.textContent = `${first}-${last} of ${data.total} applications (page ${data.page} of ${data.pages})`;
+            pagerPrev.disabled = currentPage <= 1;
+            pagerNext.disabled = currentPage >= totalPages;
+        } catch (e) {
+            showNotification(e.message || "Failed to load applications", false);
+        }
+    }
+
+    pagerPrev.addEventListener("click", () => loadPage(currentPage - 1));
+    pagerNext.addEventListener("click", () => loadPage(currentPage + 1));
+
     // ------------------ Table Inline Editing ------------------
-    document.querySelectorAll(".edit-remarks-btn").forEach(btn => {
-        btn.addEventListener("click", function() {
-            currentRow = this.closest("tr");
+    tableBody.addEventListener("click", function(e) {
+        if (e.target.closest(".edit-remarks-btn")) {
+            currentRow = e.target.closest("tr");
             modalInput.value = currentRow.querySelector(".admin-remarks-text").textContent;
-        });
+        }
     });
 
     document.getElementById("saveRemarksModal").addEventListener("click", function() {
@@ -80,54 +222,166 @@ document.addEventListener("DOMContentLoaded", function() {
     });
 
     // Update status badge on table select change
-    document.querySelectorAll(".decision-select").forEach(select => {
-        select.addEventListener("change", function() {
-            const row = this.closest("tr");
-            const badge = row.querySelector(".status-badge");
-            badge.textContent = this.value;
-            badge.className = `badge status-badge ${this.value.toLowerCase()}`;
-        });
+    tableBody.addEventListener("change", function(e) {
+        const select = e.target.closest(".decision-select");
+        if (!select) return;
+        const row = select.closest("tr");
+        const badge = row.querySelector(".status-badge");
+        badge.textContent = select.value;
+        badge.className = `badge status-badge ${select.value.toLowerCase()}`;
     });
 
     // Table save buttons
-    document.querySelectorAll(".save-btn").forEach(btn => {
-        btn.addEventListener("click", function() {
-            const row = this.closest("tr");
-            const key = row.dataset.key;
-            const status = row.querySelector(".status-badge").textContent;
-            const admindecision = row.querySelector(".decision-select").value;
-            const adminremarks = row.querySelector(".admin-remarks-text").textContent;
+    tableBody.addEventListener("click", function(e) {
+        const btn = e.target.closest(".save-btn");
+        if (!btn) return;
+
+        const row = btn.closest("tr");
+        const key = row.dataset.key;
+        const status = row.querySelector(".status-badge").textContent;
+        const admindecision = row.querySelector(".decision-select").value;
+        const adminremarks = row.querySelector(".admin-remarks-text").textContent;
+
+        const formData = new URLSearchParams();
+        // The timestamp picks out this exact row when a student has more
+        // than one application under the same key
+        formData.append("timestamp", row.dataset.timestamp);
+        formData.append("key", key);
+        formData.append("status", status);
+        formData.append("admindecision", admindecision);
+        formData.append("adminremarks", adminremarks);
+
+        fetch(updateUrl, {
+            method: "POST",
+            body: formData
+        })
+        .then(async res => {
+            const data = await res.json();
+            if (!res.ok) throw new Error(data.error || "Server error");
+            showNotification(`Table: ${data.message}`, true);
+
+            // Reload the page: totals changed and the row may no longer
+            // match the filters
+            loadPage(currentPage);
+        })
+        .catch(e => showNotification(e.message || "Update failed", false));
+    });
 
-            const formData = new URLSearchParams();
-            formData.append("key", key);
-            formData.append("status", status);
-            formData.append("admindecision", admindecision);
-            formData.append("adminremarks", adminremarks);
+    // ------------------ Bulk Decisions ------------------
+    const selectAll = document.getElementById("selectAllRows");
+    const selectedCount = document.getElementById("selectedCount");
+    const bulkApprove = document.getElementById("bulkApprove");
+    const bulkReject = document.getElementById("bulkReject");
+
+    function selectedRows() {
+        return [...tableBody.querySelectorAll(".row-select:checked")].map(cb => cb.closest("tr"));
+    }
 
-            fetch("/admin/shift_application/update", {
+    function updateSelection() {
+        const total = tableBody.querySelectorAll(".row-select").length;
+        const count = selectedRows().length;
+        selectedCount.textContent = `${count} selected`;
+        selectAll.checked = total > 0 && count === total;
+        selectAll.indeterminate = count > 0 && count < total;
+        bulkApprove.disabled = bulkReject.disabled = count === 0;
+    }
+
+    selectAll.addEventListener("change", function() {
+        tableBody.querySelectorAll(".row-select").forEach(cb => cb.checked = selectAll.checked);
+        updateSelection();
+    });
+
+    tableBody.addEventListener("change", function(e) {
+        if (e.target.closest(".row-select")) updateSelection();
+    });
+
+    // One request for every selected row
+    async function bulkDecide(admindecision) {
+        const keys = selectedRows().map(row => row.dataset.key);
+        if (!keys.length) return;
+
+        bulkApprove.disabled = bulkReject.disabled = true;
+        try {
+            const res = await fetch(batchUrl, {
                 method: "POST",
-                body: formData
-            })
-            .then(async res => {
-                const data = await res.json();
-                if (!res.ok) throw new Error(data.error || "Server error");
-                showNotification(`Table: ${data.message}`, true);
-
-                // ---------- UPDATE ROW STATE ----------
-                row.dataset.status = status.toLowerCase();
-                row.dataset.decision = admindecision.toLowerCase();
-
-                // update badge text
-                const badge = row.querySelector(".status-badge");
-                badge.textContent = status;
-                badge.className = `badge status-badge ${status.toLowerCase()}`;
-
-                // re-apply filters immediately
-                applyFilters();
-                
-            })
-            .catch(e => showNotification(e.message || "Update failed", false));
-        });
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ keys, admindecision, status: admindecision })
+            });
+            const data = await res.json();
+            if (!res.ok || !data.success) throw new Error(data.error || "Server error");
+
+            let message = `Table: ${data.message}`;
+            if (data.missing.length) message += ` (${data.missing.length} not found)`;
+            showNotification(message, true);
+        } catch (e) {
+            showNotification(e.message || "Update failed", false);
+        }
+        loadPage(currentPage);
+    }
+
+    bulkApprove.addEventListener("click", () => bulkDecide("approved"));
+    bulkReject.addEventListener("click", () => bulkDecide("rejected"));
+
+    // ------------------ Auto-allocation ------------------
+    const allocateModal = new bootstrap.Modal(document.getElementById("allocateModal"));
+    const allocateRows = document.getElementById("allocateRows");
+    const allocateSummary = document.getElementById("allocateSummary");
+    const allocateApply = document.getElementById("allocateApply");
+    let allocateKeys = [];  // the previewed assignments; exactly these are approved
+
+    function showAllocation(data) {
+        allocateRows.replaceChildren(...data.assignments.map(a => {
+            const row = document.createElement("tr");
+            [a.date, a.shiftperiod, a.shiftlevel, a.id, a.name, a.totalApprovedShift]
+                .forEach(v => row.appendChild(cell(v)));
+            return row;
+        }));
+        allocateSummary.textContent =
+            `${data.assigned} of ${data.open_positions} open positions filled ` +
+            `from ${data.candidates} eligible pending applications.`;
+    }
+
+    document.getElementById("allocateBtn").addEventListener("click", async function() {
+        allocateApply.disabled = true;
+        allocateKeys = [];
+        allocateRows.replaceChildren();
+        allocateSummary.textContent = "Working out the allocation...";
+        allocateModal.show();
+
+        try {
+            const params = new URLSearchParams({ month: viewMonth, year: viewYear });
+            const res = await fetch(`${allocatePreviewUrl}?${params}`);
+            const data = await res.json();
+            if (!res.ok || !data.success) throw new Error(data.error || "Server error");
+            showAllocation(data);
+            allocateKeys = data.assignments.map(a => a.key);
+            allocateApply.disabled = allocateKeys.length === 0;
+        } catch (e) {
+            allocateSummary.textContent = e.message || "Allocation failed";
+        }
+    });
+
+    allocateApply.addEventListener("click", async function() {
+        allocateApply.disabled = true;
+        try {
+            const res = await fetch(allocateApplyUrl, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ month: viewMonth, year: viewYear, keys: allocateKeys })
+            });
+            const data = await res.json();
+            if (!res.ok || !data.success) throw new Error(data.error || "Server error");
+            allocateModal.hide();
+            const stale = data.stale.length
+                ? `; ${data.stale.length} skipped as they changed since the preview`
+                : "";
+            showNotification(`Auto-allocation: ${data.updated} applications approved${stale}`,
+                             data.stale.length === 0);
+            loadPage(currentPage);
+        } catch (e) {
+            showNotification(e.message || "Allocation failed", false);
+            allocateApply.disabled = false;
+        }
     });
 
     // ------------------ Calendar Inline Editing ------------------
@@ -189,33 +443,7 @@ document.addEventListener("DOMContentLoaded", function() {
     });
 
     // ------------------ Table Filters ------------------
-    function applyFilters() {
-        const text = filterText.value.toLowerCase();
-        const status = filterStatus.value;
-        const decision = filterDecision.value;
-        const ojt = filterOJT.value;
-        const night = filterNight.value;
-
-        document.querySelectorAll("#applicationTable tbody tr").forEach(row => {
-            let visible = true;
-
-            if (text) {
-                const id = row.dataset.id || "";
-                const name = row.dataset.name || "";
-                visible &= id.includes(text) || name.includes(text);
-            }
-
-            if (filterDate.value && row.dataset.date !== filterDate.value) visible = false;
-            if (filterShift.value && row.dataset.shift !== filterShift.value) visible = false;
-            if (filterLevel.value && row.dataset.level !== filterLevel.value) visible = false;
-            if (status && row.dataset.status !== status) visible = false;
-            if (decision && row.dataset.decision !== decision) visible = false;
-            if (ojt && row.dataset.ojt !== ojt) visible = false;
-            if (night && row.dataset.night !== night) visible = false;
-
-            row.style.display = visible ? "" : "none";
-        });
-    }
+    let filterTimer = null;
 
     [
     filterText, filterStatus, filterDecision,
@@ -223,22 +451,14 @@ document.addEventListener("DOMContentLoaded", function() {
     filterShift, filterLevel
     ].forEach(el => {
         el.addEventListener("input", () => {
-            applyFilters();
-
             // save filters
-            localStorage.setItem("adminShiftFilters", JSON.stringify({
-                text: filterText.value,
-                date: filterDate.value,
-                shift: filterShift.value,
-                level: filterLevel.value,
-                status: filterStatus.value,
-                decision: filterDecision.value,
-                ojt: filterOJT.value,
-                night: filterNight.value
-            }));
+            localStorage.setItem("adminShiftFilters", JSON.stringify(currentFilters()));
+
+            // Typing waits for a pause; the server does the filtering
+            clearTimeout(filterTimer);
+            filterTimer = setTimeout(() => loadPage(1), el === filterText ? 300 : 0);
         });
     });
 
-    applyFilters();
-});
-
+    loadPage(1);
+});
\ No newline at end of file
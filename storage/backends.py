@@ -0,0 +1,561 @@
+# backends.py
+import json
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
+DATA_FOLDER = "data"
+
+# Workbooks that can live in the database, keyed by file name
+TABLES = {
+    "account.xlsx": "account",
+    "slot_control.xlsx": "slot_control",
+    "shift_application.xlsx": "shift_application",
+    "shift_record.xlsx": "shift_record",
+    "shift_verify.xlsx": "shift_verify",
+    "bot_subscribers.xlsx": "bot_subscribers",
+    "bot_links.xlsx": "bot_links",
+    "attendance_events.xlsx": "attendance_events",
+}
+
+# Journaled rows are folded into the workbook once there are this many
+JOURNAL_COMPACT_ROWS = int(os.getenv("JOURNAL_COMPACT_ROWS", "200"))
+
+# Lookup indexes, created once every listed column exists in the table
+INDEXES = {
+    "account": ["ID"],
+    "slot_control": ["date", "shiftperiod", "shiftlevel"],
+    "shift_application": ["id", "date", "shiftperiod", "shiftlevel"],
+    "shift_record": ["id", "date", "shiftperiod", "shiftlevel"],
+    "shift_verify": ["studentcoachid", "date", "shiftperiod", "shiftlevel"],
+    "attendance_events": ["id", "date", "shiftperiod", "shiftlevel"],
+}
+
+_copy_on_write = None
+
+
+def copy_on_write_enabled():
+    # pandas >= 3 always uses Copy-on-Write; 2.x only when opted in. Checked
+    # on first use so importing this module does not import pandas
+    global _copy_on_write
+    if _copy_on_write is None:
+        if int(pd.__version__.split(".")[0]) >= 3:
+            _copy_on_write = True
+        else:
+            try:
+                _copy_on_write = bool(pd.get_option("mode.copy_on_write"))
+            except Exception:
+                _copy_on_write = False
+    return _copy_on_write
+
+
+def file_signature(filepath):
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def read_workbook(filepath):
+    return pd.read_excel(filepath, engine="openpyxl")
+
+
+def write_workbook(df, filepath):
+    """Write df to filepath atomically (temp file in the same folder + move)."""
+    directory = os.path.dirname(filepath) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(mode="w+b",
+                                     suffix=".xlsx",
+                                     dir=directory,
+                                     delete=False) as tmp:
+        temp_path = tmp.name
+    try:
+        df.to_excel(temp_path, index=False, engine="openpyxl")
+        shutil.move(temp_path, filepath)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ExcelBackend:
+    """Every table is its own .xlsx workbook.
+
+    Full writes replace the workbook. Appended rows go to a JSON-lines
+    journal next to it (<file>.journal) and are merged in on read, so adding
+    a row never re-serializes the rows before it. The journal is folded
+    into the workbook on the next full write, or once it holds
+    JOURNAL_COMPACT_ROWS rows.
+    """
+
+    name = "excel"
+
+    def __init__(self):
+        self._base = {}  # path -> (signature, parsed workbook)
+        self._base_lock = threading.Lock()
+
+    def signature(self, filepath):
+        base = file_signature(filepath)
+        journal = file_signature(journal_path(filepath))
+        if base is None and journal is None:
+            return None
+        return (base, journal)
+
+    def read(self, filepath):
+        df = self._read_base(filepath)
+        rows = read_journal(filepath)
+        if not rows:
+            return df
+        journal_df = pd.DataFrame(rows)
+        if df.empty and len(df.columns) == 0:
+            return journal_df
+        return pd.concat([df, journal_df], ignore_index=True)
+
+    def write(self, df, filepath):
+        write_workbook(df, filepath)
+        self._drop_journal(filepath)
+
+    def append(self, rows, filepath):
+        with open(journal_path(filepath), "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(
+                    json.dumps({str(k): _plain_value(v)
+                                for k, v in row.items()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if len(read_journal(filepath)) >= JOURNAL_COMPACT_ROWS:
+            self.compact(filepath)
+
+    def update(self, key_column, updates, filepath):
+        # read() returns a copy (see _read_base), so a failed write leaves
+        # the memoized workbook as it was
+        df = self.read(filepath)
+        columns = _key_columns(key_column)
+        if df.empty or not set(columns) <= set(df.columns):
+            return 0
+        rows_by_key = _rows_by_key(df, columns)
+        changed = 0
+        for key, values in updates.items():
+            rows = rows_by_key.get(_key_of(key))
+            if not rows:
+                continue
+            for col, val in values.items():
+                if col in df.columns and (df.loc[rows, col] == val).all():
+                    continue
+                try:
+                    df.loc[rows, col] = val
+                except (TypeError, ValueError):
+                    df[col] = df[col].astype(object)
+                    df.loc[rows, col] = val
+                changed += 1
+        if changed:
+            self.write(df, filepath)
+        return changed
+
+    def delete(self, key_column, keys, filepath):
+        df = self.read(filepath)
+        columns = _key_columns(key_column)
+        if df.empty or not set(columns) <= set(df.columns):
+            return 0
+        rows_by_key = _rows_by_key(df, columns)
+        rows = sorted({r for key in keys for r in rows_by_key.get(_key_of(key), [])})
+        if rows:
+            self.write(df.drop(rows).reset_index(drop=True), filepath)
+        return len(rows)
+
+    def compact(self, filepath):
+        """Fold the journal into the workbook."""
+        if os.path.exists(journal_path(filepath)):
+            self.write(self.read(filepath), filepath)
+
+    def import_file(self, filepath):
+        # The uploaded workbook already is the storage; it supersedes any
+        # rows journaled against the previous one
+        self._drop_journal(filepath)
+
+    def export_file(self, filepath):
+        self.compact(filepath)
+
+    def _read_base(self, filepath):
+        # The parsed workbook is kept until the file changes; callers get a
+        # copy of it, so whatever they do with it never leaks into the memo
+        key = os.path.abspath(filepath)
+        signature = file_signature(filepath)
+        if signature is None:
+            return pd.DataFrame()
+        with self._base_lock:
+            entry = self._base.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1].copy(deep=not copy_on_write_enabled())
+        df = read_workbook(filepath)
+        with self._base_lock:
+            self._base[key] = (signature, df)
+        return df.copy(deep=not copy_on_write_enabled())
+
+    def _drop_journal(self, filepath):
+        try:
+            os.remove(journal_path(filepath))
+        except FileNotFoundError:
+            pass
+
+
+def journal_path(filepath):
+    return filepath + ".journal"
+
+
+def read_journal(filepath):
+    """Rows appended to filepath's journal, oldest first."""
+    try:
+        with open(journal_path(filepath), encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    rows = []
+    for line in lines:
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            # A torn last line from a crash mid-append; skip it
+            continue
+    return rows
+
+
+def _key_columns(key_column):
+    """update()/delete() take one key column or a tuple of them."""
+    if isinstance(key_column, (tuple, list)):
+        return list(key_column)
+    return [key_column]
+
+
+def _key_text(val):
+    # Keys are compared as stripped text of the stored value; a whole float
+    # matches its int, as SQLite and pandas may read either back
+    val = _plain_value(val)
+    if val is None:
+        return ""
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)
+    return str(val).strip()
+
+
+def _key_of(key):
+    """A key value, or a tuple of them for several key columns, as text."""
+    values = key if isinstance(key, tuple) else (key, )
+    return tuple(_key_text(v) for v in values)
+
+
+def _rows_by_key(df, columns):
+    rows = {}
+    texts = [df[c].map(_key_text) for c in columns]
+    for idx, key in zip(df.index, zip(*texts)):
+        rows.setdefault(key, []).append(idx)
+    return rows
+
+
+def _key_sql(column):
+    # SQL side of _key_text()
+    c = _quote(column)
+    return (f"(CASE WHEN typeof({c})='real' AND {c}=CAST({c} AS INTEGER) "
+            f"THEN CAST(CAST({c} AS INTEGER) AS TEXT) "
+            f"ELSE COALESCE(TRIM(CAST({c} AS TEXT)), '') END)")
+
+
+def _plain_value(val):
+    """Convert a DataFrame cell to a value SQLite and JSON can both store."""
+    if val is None:
+        return None
+    if isinstance(val, float) and math.isnan(val):
+        return None
+    if val is pd.NaT:
+        return None
+    if isinstance(val, datetime):  # includes pd.Timestamp
+        # Plain dates are written by the app as YYYY-MM-DD; keep one format
+        # per column or pd.to_datetime() turns the odd ones into NaT
+        if (val.hour, val.minute, val.second, val.microsecond) == (0, 0, 0, 0):
+            return val.strftime("%Y-%m-%d")
+        return val.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(val, date):
+        return val.strftime("%Y-%m-%d")
+    if hasattr(val, "item"):  # numpy scalars
+        return _plain_value(val.item())
+    if isinstance(val, (int, float, str, bytes)):
+        return val
+    return str(val)
+
+
+def _quote(identifier):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+class SQLiteBackend:
+    """The five data workbooks stored as tables of one SQLite database.
+
+    Files outside DATA_FOLDER (or not listed in TABLES) fall through to the
+    Excel backend. A table that is missing from the database is imported
+    from its .xlsx the first time it is touched.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path, data_folder=DATA_FOLDER):
+        self.db_path = db_path
+        self.data_folder = os.path.abspath(data_folder)
+        self._excel = ExcelBackend()
+        self._local = threading.local()
+        self._bootstrap_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS _meta ("
+            "name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    # ---------- connection ----------
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; writes open explicit transactions so that
+            # DDL (DROP/CREATE) is part of them too
+            conn = sqlite3.connect(self.db_path,
+                                   timeout=30,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def table_for(self, filepath):
+        path = os.path.abspath(filepath)
+        if os.path.dirname(path) != self.data_folder:
+            return None
+        return TABLES.get(os.path.basename(path))
+
+    def _table_exists(self, conn, table):
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+            (table, )).fetchone()
+        return row is not None
+
+    def _ensure_table(self, table, filepath):
+        conn = self._connect()
+        if self._table_exists(conn, table):
+            return True
+        with self._bootstrap_lock:
+            if self._table_exists(conn, table):
+                return True
+            if not os.path.exists(filepath):
+                return False
+            self._replace(table, self._excel.read(filepath))
+            print(f"[SQLiteBackend] Imported {filepath} into {table}")
+            return True
+
+    # ---------- backend API ----------
+    def signature(self, filepath):
+        table = self.table_for(filepath)
+        if table is None:
+            return self._excel.signature(filepath)
+        if not self._ensure_table(table, filepath):
+            return None
+        row = self._connect().execute(
+            "SELECT version FROM _meta WHERE name=?", (table, )).fetchone()
+        return ("sqlite", row[0] if row else 0)
+
+    def read(self, filepath):
+        table = self.table_for(filepath)
+        if table is None:
+            return self._excel.read(filepath)
+        if not self._ensure_table(table, filepath):
+            return pd.DataFrame()
+        df = pd.read_sql_query(f"SELECT * FROM {_quote(table)} ORDER BY rowid",
+                               self._connect())
+        df = df.drop(columns=["_empty"], errors="ignore")
+        if len(df.columns) == 0:
+            return pd.DataFrame()
+        return df
+
+    def write(self, df, filepath):
+        table = self.table_for(filepath)
+        if table is None:
+            return self._excel.write(df, filepath)
+        self._replace(table, df)
+
+    def append(self, rows, filepath):
+        table = self.table_for(filepath)
+        if table is None:
+            return self._excel.append(rows, filepath)
+        if not rows:
+            return
+        if not self._ensure_table(table, filepath):
+            self._replace(table, pd.DataFrame(rows))
+            return
+
+        columns = []
+        for row in rows:
+            columns.extend(str(k) for k in row if str(k) not in columns)
+
+        with self._transaction() as conn:
+            existing = [
+                r[1] for r in conn.execute(
+                    f"PRAGMA table_info({_quote(table)})").fetchall()
+            ]
+            known = {c.lower() for c in existing}
+            for col in columns:
+                if col.lower() not in known:
+                    conn.execute(f"ALTER TABLE {_quote(table)} "
+                                 f"ADD COLUMN {_quote(col)}")
+                    known.add(col.lower())
+            conn.executemany(
+                f"INSERT INTO {_quote(table)} (" +
+                ", ".join(_quote(c) for c in columns) + ") VALUES (" +
+                ", ".join("?" * len(columns)) + ")",
+                ([_plain_value(row.get(c)) for c in columns] for row in rows))
+            self._create_indexes(conn, table, existing + columns)
+            self._bump_version(conn, table)
+
+    def update(self, key_column, updates, filepath):
+        table = self.table_for(filepath)
+        if table is None:
+            return self._excel.update(key_column, updates, filepath)
+        if not updates or not self._ensure_table(table, filepath):
+            return 0
+
+        columns = _key_columns(key_column)
+        where = " AND ".join(f"{_key_sql(c)}=?" for c in columns)
+        changed = 0
+        with self._transaction() as conn:
+            existing = self._columns(conn, table)
+            if not {c.lower() for c in columns} <= existing:
+                return 0
+            for key, values in updates.items():
+                for col in values:
+                    if col.lower() not in existing:
+                        conn.execute(f"ALTER TABLE {_quote(table)} "
+                                     f"ADD COLUMN {_quote(col)}")
+                        existing.add(col.lower())
+                cols = list(values)
+                cur = conn.execute(
+                    f"UPDATE {_quote(table)} SET " +
+                    ", ".join(f"{_quote(c)}=?" for c in cols) + f" WHERE {where}",
+                    [_plain_value(values[c]) for c in cols] + list(_key_of(key)))
+                changed += cur.rowcount
+            if changed:
+                self._bump_version(conn, table)
+        return changed
+
+    def delete(self, key_column, keys, filepath):
+        table = self.table_for(filepath)
+        if table is None:
+            return self._excel.delete(key_column, keys, filepath)
+        if not keys or not self._ensure_table(table, filepath):
+            return 0
+
+        columns = _key_columns(key_column)
+        where = " AND ".join(f"{_key_sql(c)}=?" for c in columns)
+        deleted = 0
+        with self._transaction() as conn:
+            if not {c.lower() for c in columns} <= self._columns(conn, table):
+                return 0
+            for key in keys:
+                deleted += conn.execute(
+                    f"DELETE FROM {_quote(table)} WHERE {where}",
+                    list(_key_of(key))).rowcount
+            if deleted:
+                self._bump_version(conn, table)
+        return deleted
+
+    def import_file(self, filepath):
+        table = self.table_for(filepath)
+        if table is not None:
+            self._replace(table, read_workbook(filepath))
+            self._excel.import_file(filepath)
+
+    def export_file(self, filepath):
+        table = self.table_for(filepath)
+        if table is not None and self._ensure_table(table, filepath):
+            write_workbook(self.read(filepath), filepath)
+
+    # ---------- internals ----------
+    def _replace(self, table, df):
+        columns = [str(c) for c in df.columns]
+        lowered = [c.lower() for c in columns]
+        if len(set(lowered)) != len(lowered):
+            raise ValueError(
+                f"[SQLiteBackend] {table} has columns differing only by case")
+
+        with self._transaction() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+            if columns:
+                conn.execute(f"CREATE TABLE {_quote(table)} (" +
+                             ", ".join(_quote(c) for c in columns) + ")")
+                conn.executemany(
+                    f"INSERT INTO {_quote(table)} VALUES (" +
+                    ", ".join("?" * len(columns)) + ")",
+                    ([_plain_value(v) for v in row]
+                     for row in df.itertuples(index=False, name=None)))
+                self._create_indexes(conn, table, columns)
+            else:
+                # Keep an (empty) table so the file is not re-imported
+                conn.execute(f"CREATE TABLE {_quote(table)} (_empty)")
+            self._bump_version(conn, table)
+
+    def _columns(self, conn, table):
+        return {
+            r[1].lower()
+            for r in conn.execute(
+                f"PRAGMA table_info({_quote(table)})").fetchall()
+        }
+
+    def _create_indexes(self, conn, table, columns):
+        wanted = INDEXES.get(table, [])
+        if wanted and all(c in columns for c in wanted):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote('idx_' + table + '_key')} "
+                f"ON {_quote(table)} (" + ", ".join(_quote(c)
+                                                   for c in wanted) + ")")
+
+    def _bump_version(self, conn, table):
+        conn.execute(
+            "INSERT INTO _meta (name, version) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET version=excluded.version",
+            (table, time.time_ns()))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Storage backend picked by STORAGE_BACKEND ("excel" or "sqlite")."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = os.getenv("STORAGE_BACKEND", "excel").strip().lower()
+                if kind == "sqlite":
+                    _backend = SQLiteBackend(
+                        os.getenv("SQLITE_PATH",
+                                  os.path.join(DATA_FOLDER, "projecthub.db")))
+                else:
+                    _backend = ExcelBackend()
+    return _backend
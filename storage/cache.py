@@ -0,0 +1,95 @@
+# cache.py
+import os
+import threading
+
+from startup import lazy_import
+
+from .backends import copy_on_write_enabled, get_backend
+
+pd = lazy_import("pandas")
+
+
+class WorkbookCache:
+    """Keeps the parsed DataFrame of each workbook until the file changes.
+
+    "Changes" is whatever the storage backend's signature says: the file's
+    (mtime_ns, size) for Excel, a per-table version for SQLite.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._entries = {}  # path -> (signature, DataFrame)
+        self._derived = {}  # (path, builder) -> (signature, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, filepath):
+        key = os.path.abspath(filepath)
+        backend = self.backend
+        # Take the signature BEFORE reading so a write racing with the parse
+        # leaves a stale signature behind and forces a re-read next time
+        signature = backend.signature(filepath)
+        if signature is None:
+            self.invalidate(filepath)
+            return pd.DataFrame()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return self._view(entry[1])
+
+        df = backend.read(filepath)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (signature, df)
+        return self._view(df)
+
+    def derive(self, filepath, builder, loader=None):
+        """builder(df) for the current version of filepath, memoised.
+
+        Used for indexes and other structures built from a whole workbook;
+        they are rebuilt only when the data changes. The value is shared
+        between callers and must be treated as read-only.
+        """
+        key = (os.path.abspath(filepath), builder)
+        signature = self.backend.signature(filepath)
+        with self._lock:
+            entry = self._derived.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+
+        # Built from data read after the signature was taken, so if a write
+        # slips in between, the stored signature is already stale and the
+        # value gets rebuilt on the next call
+        df = (loader or self.load)(filepath)
+        value = builder(df)
+        with self._lock:
+            self._derived[key] = (signature, value)
+        return value
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def invalidate(self, filepath=None):
+        with self._lock:
+            if filepath is None:
+                self._entries.clear()
+                self._derived.clear()
+            else:
+                path = os.path.abspath(filepath)
+                self._entries.pop(path, None)
+                for key in [k for k in self._derived if k[0] == path]:
+                    del self._derived[key]
+
+    @staticmethod
+    def _view(df):
+        # Callers freely mutate what they get back; under Copy-on-Write a
+        # shallow copy is enough to keep the cached frame untouched
+        return df.copy(deep=not copy_on_write_enabled())
+
+
+workbook_cache = WorkbookCache()
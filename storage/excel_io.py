@@ -0,0 +1,156 @@
+# excel_io.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from startup import lazy_import
+
+from .backends import get_backend
+from .cache import workbook_cache
+from .locks import EXCLUSIVE, SHARED, file_lock
+
+pd = lazy_import("pandas")
+
+# Loads/saves slower than this are logged
+SLOW_IO_MS = float(os.getenv("STORAGE_SLOW_MS", "250"))
+
+
+class IOStats:
+    """Call counts and timings of load/save per file."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}  # (op, filename) -> [count, total_ms, max_ms]
+
+    def record(self, op, filepath, elapsed_ms):
+        key = (op, os.path.basename(filepath))
+        with self._lock:
+            entry = self._stats.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            entry[2] = max(entry[2], elapsed_ms)
+        if elapsed_ms >= SLOW_IO_MS:
+            print(f"[storage] slow {op} of {filepath}: {elapsed_ms:.0f} ms")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                f"{op}:{name}": {
+                    "count": count,
+                    "avg_ms": round(total / count, 2),
+                    "max_ms": round(peak, 2)
+                }
+                for (op, name), (count, total, peak) in self._stats.items()
+            }
+
+
+io_stats = IOStats()
+
+
+@contextmanager
+def _timed(op, filepath):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        io_stats.record(op, filepath, (time.perf_counter() - start) * 1000)
+
+
+def load_excel_safe(filepath):
+    """Load a workbook as a DataFrame with stripped column names.
+
+    Served from the workbook cache while the file is unchanged. Returns an
+    empty DataFrame if the file is missing or unreadable.
+    """
+    try:
+        with _timed("load", filepath), file_lock(filepath, SHARED):
+            df = workbook_cache.load(filepath)
+        df.columns = df.columns.astype(str).str.strip()
+        return df
+    except Exception as e:
+        print(f"[load_excel_safe] Error reading {filepath}: {e}")
+        return pd.DataFrame()
+
+
+def load_derived(filepath, builder):
+    """builder(load_excel_safe(filepath)), rebuilt only when the file changes.
+
+    For indexes and lookup tables over a whole workbook. The returned value
+    is shared by every caller; do not mutate it.
+    """
+    with _timed("derive", filepath), file_lock(filepath, SHARED):
+        return workbook_cache.derive(filepath, builder, load_excel_safe)
+
+
+def save_excel_safe(df: "pd.DataFrame", filepath: str):
+    """Atomically replace the stored workbook with df."""
+    if df is None:
+        raise ValueError("[save_excel_safe] DataFrame is None")
+    if not filepath.lower().endswith(".xlsx"):
+        filepath += ".xlsx"
+    try:
+        with _timed("save", filepath), file_lock(filepath, EXCLUSIVE):
+            get_backend().write(df, filepath)
+    except Exception as e:
+        raise RuntimeError(f"[save_excel_safe] Failed saving {filepath}: {e}")
+    finally:
+        workbook_cache.invalidate(filepath)
+
+
+def append_excel_rows(filepath, rows):
+    """Add rows (a list of dicts) after the existing ones.
+
+    Unlike save_excel_safe this does not rewrite the rows already stored,
+    so its cost does not grow with the size of the workbook.
+    """
+    if not rows:
+        return
+    try:
+        with _timed("append", filepath), file_lock(filepath, EXCLUSIVE):
+            get_backend().append(rows, filepath)
+    except Exception as e:
+        raise RuntimeError(f"[append_excel_rows] Failed appending to {filepath}: {e}")
+    finally:
+        workbook_cache.invalidate(filepath)
+
+
+def update_excel_rows(filepath, key_column, updates):
+    """Set columns on the rows whose key_column matches, e.g.
+
+        update_excel_rows(ACCOUNT_FILE, "ID", {"2401554": {"totalPendingShift": 2}})
+
+    key_column may also be a tuple of columns, keyed by tuples of values:
+
+        update_excel_rows(SLOT_FILE, ("date", "shiftperiod", "shiftlevel"),
+                          {("2026-03-02", "Morning", "L4"): {"isopen": 1}})
+
+    Keys are compared as stripped strings of the stored values. Returns the
+    number of changes; nothing is written when every value is already up
+    to date. On SQLite this is an UPDATE of the matching rows only.
+    """
+    if not updates:
+        return 0
+    try:
+        with _timed("update", filepath), file_lock(filepath, EXCLUSIVE):
+            return get_backend().update(key_column, updates, filepath)
+    except Exception as e:
+        raise RuntimeError(f"[update_excel_rows] Failed updating {filepath}: {e}")
+    finally:
+        workbook_cache.invalidate(filepath)
+
+
+def delete_excel_rows(filepath, key_column, keys):
+    """Remove the rows whose key_column (or tuple of columns) matches one of
+    keys, compared like update_excel_rows. Returns the number of rows
+    removed.
+    """
+    if not keys:
+        return 0
+    try:
+        with _timed("delete", filepath), file_lock(filepath, EXCLUSIVE):
+            return get_backend().delete(key_column, keys, filepath)
+    except Exception as e:
+        raise RuntimeError(f"[delete_excel_rows] Failed deleting from {filepath}: {e}")
+    finally:
+        workbook_cache.invalidate(filepath)
@@ -0,0 +1,102 @@
+# locks.py
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locks only
+    fcntl = None
+
+SHARED = "shared"
+EXCLUSIVE = "exclusive"
+
+_held = threading.local()  # per thread: path -> [mode, depth, handle]
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _lock_path(filepath):
+    return os.path.abspath(filepath) + ".lock"
+
+
+def _held_locks():
+    if not hasattr(_held, "locks"):
+        _held.locks = {}
+    return _held.locks
+
+
+def _acquire(path, mode):
+    if fcntl is not None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # flock() treats every open() as a separate owner, so this also
+        # serializes threads of the same process
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if mode == EXCLUSIVE else fcntl.LOCK_SH)
+        except Exception:
+            os.close(fd)
+            raise
+        return fd
+
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(path, threading.Lock())
+    lock.acquire()
+    return lock
+
+
+def _release(handle):
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            os.close(handle)
+    else:
+        handle.release()
+
+
+@contextmanager
+def file_lock(filepath, mode=SHARED):
+    """Reader/writer lock on filepath, held across threads and processes.
+
+    Any number of SHARED holders may run together; an EXCLUSIVE holder runs
+    alone. Locks are re-entrant per thread, so a transaction holding the
+    exclusive lock can call load_excel_safe/save_excel_safe freely. A shared
+    lock cannot be upgraded; open a transaction up front instead.
+    """
+    path = _lock_path(filepath)
+    held = _held_locks()
+    entry = held.get(path)
+
+    if entry is not None:
+        if mode == EXCLUSIVE and entry[0] == SHARED:
+            raise RuntimeError(
+                f"[file_lock] Cannot upgrade shared lock on {filepath}")
+        entry[1] += 1
+        try:
+            yield
+        finally:
+            entry[1] -= 1
+        return
+
+    handle = _acquire(path, mode)
+    held[path] = [mode, 1, handle]
+    try:
+        yield
+    finally:
+        del held[path]
+        _release(handle)
+
+
+@contextmanager
+def excel_transaction(*filepaths):
+    """Exclusive lock on every file for a load -> mutate -> save sequence.
+
+    Files are locked in a fixed order so two transactions touching the same
+    files can never deadlock each other.
+    """
+    paths = sorted(set(os.path.abspath(p) for p in filepaths))
+    with ExitStack() as stack:
+        for path in paths:
+            stack.enter_context(file_lock(path, EXCLUSIVE))
+        yield
@@ -1,33 +1,87 @@
 # bot.py
-from telegram.ext import Updater, CommandHandler, CallbackQueryHandler
+from telegram import Bot
+from telegram.ext import (Updater, CommandHandler, CallbackQueryHandler,
+                          MessageHandler, Filters)
 import os
 
-from .handlers import main_menu, handle_menu
+import startup
+
+from .handlers import (main_menu, handle_menu, handle_text, handle_subscribe,
+                       handle_unsubscribe, handle_link, handle_unlink)
 from .scheduler import start_scheduler
+from .workers import BOT_WORKERS, ChatQueue, make_request
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+def send_start(bot, chat_id):
+    bot.send_message(
+        chat_id=chat_id,
+        text="ProjectHub Duty Bot",
+        reply_markup=main_menu()
+    )
+
 def start_bot():
+    if not BOT_TOKEN:
+        print("BOT_TOKEN is not set, Telegram bot disabled")
+        return False
+
     print("Telegram bot initializing")
 
-    updater = Updater(BOT_TOKEN, use_context=True)
+    updater = Updater(bot=Bot(BOT_TOKEN, request=make_request()),
+                      workers=BOT_WORKERS,
+                      use_context=True)
     dp = updater.dispatcher
 
+    # Handlers only queue the work; the dispatcher's worker pool runs it
+    chats = ChatQueue(dp.run_async)
+
     dp.add_handler(CommandHandler(
         "start",
-        lambda u, c: c.bot.send_message(
-            chat_id=u.effective_chat.id,
-            text="ProjectHub Duty Bot",
-            reply_markup=main_menu()
-        )
+        lambda u, c: chats.put(u.effective_chat.id, send_start,
+                               c.bot, u.effective_chat.id)
     ))
 
     dp.add_handler(CallbackQueryHandler(
-        lambda u, c: handle_menu(u.callback_query, c.bot)
+        lambda u, c: chats.put(u.effective_chat.id, handle_menu,
+                               u.callback_query, c.bot)
+    ))
+
+    # Which chats/topics get the scheduled notifications
+    dp.add_handler(CommandHandler(
+        "subscribe",
+        lambda u, c: chats.put(u.effective_chat.id, handle_subscribe,
+                               u.effective_message, c.bot, c.args)
+    ))
+
+    dp.add_handler(CommandHandler(
+        "unsubscribe",
+        lambda u, c: chats.put(u.effective_chat.id, handle_unsubscribe,
+                               u.effective_message, c.bot)
+    ))
+
+    # Personal shift reminders
+    dp.add_handler(CommandHandler(
+        "link",
+        lambda u, c: chats.put(u.effective_chat.id, handle_link,
+                               u.effective_message, c.bot, c.args)
+    ))
+
+    dp.add_handler(CommandHandler(
+        "unlink",
+        lambda u, c: chats.put(u.effective_chat.id, handle_unlink,
+                               u.effective_message, c.bot)
+    ))
+
+    # Replies to "Search by Date" / "Search by Name"
+    dp.add_handler(MessageHandler(
+        Filters.text & ~Filters.command,
+        lambda u, c: chats.put(u.effective_chat.id, handle_text,
+                               u.effective_message, c.bot)
     ))
 
-    start_scheduler()
+    start_scheduler(updater.bot)
 
-    print("Telegram bot polling started")
+    startup.mark("telegram bot")
+    print(f"Telegram bot polling started ({BOT_WORKERS} workers)")
     updater.start_polling()
     updater.idle()   # ← IMPORTANT for clean shutdown
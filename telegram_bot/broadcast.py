@@ -0,0 +1,93 @@
+# broadcast.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+
+from .workers import BOT_WORKERS
+
+# Telegram allows about 30 messages/s overall and 20/min into one group
+GLOBAL_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+CHAT_RATE = 20 / 60
+SEND_ATTEMPTS = 4
+
+
+class TokenBucket:
+    """rate tokens per second, up to capacity; take() blocks until one is free."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens +
+                                   (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Broadcaster:
+    """Sends one message per chat concurrently, within Telegram's limits."""
+
+    def __init__(self, workers=BOT_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix="broadcast")
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._chats = {}  # chat_id -> TokenBucket
+        self._chats_lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id):
+        with self._chats_lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = self._chats[chat_id] = TokenBucket(CHAT_RATE, 3)
+            return bucket
+
+    def send_all(self, bot, messages):
+        """messages: [(send_message kwargs), ...]. Returns how many were sent."""
+        futures = [self._pool.submit(self._send, bot, kwargs)
+                   for kwargs in messages]
+        return sum(1 for f in futures if f.result())
+
+    def _send(self, bot, kwargs):
+        chat_id = kwargs["chat_id"]
+        delay = 1.0
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            self._chat_bucket(chat_id).take()
+            self._global.take()
+            try:
+                bot.send_message(**kwargs)
+                return True
+            except RetryAfter as e:
+                # Flood control: Telegram says exactly how long to wait
+                print(f"[Broadcaster] Rate limited for {chat_id}, "
+                      f"retrying in {e.retry_after}s")
+                time.sleep(e.retry_after)
+            except BadRequest as e:
+                print(f"[Broadcaster] Send to {chat_id} rejected: {e}")
+                return False
+            except NetworkError as e:  # includes TimedOut
+                if attempt == SEND_ATTEMPTS:
+                    break
+                print(f"[Broadcaster] Send to {chat_id} failed ({e}), "
+                      f"retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay *= 2
+            except TelegramError as e:
+                # Bot removed from the chat, chat migrated, ...
+                print(f"[Broadcaster] Send to {chat_id} failed: {e}")
+                return False
+        print(f"[Broadcaster] Giving up on {chat_id}")
+        return False
@@ -1,27 +1,40 @@
-import pandas as pd
+from startup import lazy_import
 from datetime import date
 from zoneinfo import ZoneInfo
 import os
 
+from storage.excel_io import load_derived
+
+pd = lazy_import("pandas")
+
 SG_TZ = ZoneInfo("Asia/Singapore")
 RECORD_FILE = os.path.join("data", "shift_record.xlsx")
+APPLICATION_FILE = os.path.join("data", "shift_application.xlsx")
 
-def load_approved_shifts(target_date: date):
-    if not os.path.exists(RECORD_FILE):
-        return []
 
-    df = pd.read_excel(RECORD_FILE, engine="openpyxl")
+def build_approved_index(df):
+    """{date: [{"name", "shift", "level"}, ...]} over all shift records."""
+    index = {}
+    if df.empty:
+        return index
+
+    df = df.copy()
     df.columns = df.columns.str.strip().str.lower()
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+    blank = pd.Series("", index=df.index)
 
-    day_df = df[df["date"] == target_date]
+    days = pd.to_datetime(df.get("date"), errors="coerce").dt.date
+    rows = pd.DataFrame({
+        "name": df.get("name", blank),
+        "shift": df.get("shiftperiod", blank),
+        "level": df.get("shiftlevel", blank)
+    })
+    for day, row in zip(days, rows.to_dict("records")):
+        if pd.notna(day):
+            index.setdefault(day, []).append(row)
+    return index
 
-    shifts = []
-    for _, r in day_df.iterrows():
-        shifts.append({
-            "name": r.get("name", ""),
-            "shift": r.get("shiftperiod", ""),
-            "level": r.get("shiftlevel", "")
-        })
 
-    return shifts
+def load_approved_shifts(target_date: date):
+    # Index shared with the web app's cache; rebuilt only when the file changes
+    index = load_derived(RECORD_FILE, build_approved_index)
+    return [dict(s) for s in index.get(target_date, [])]
@@ -0,0 +1,72 @@
+# duty_messages.py
+import threading
+
+from storage.cache import workbook_cache
+
+from .data_reader import APPLICATION_FILE, RECORD_FILE, load_approved_shifts
+from .message_builder import build_duty_message
+
+
+class DutyMessageCache:
+    """Rendered duty message per date, dropped when the shift data changes.
+
+    The version is the storage signature of the record and application
+    files, so edits made by the web app (even from another process) are
+    picked up on the next lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._messages = {}  # date -> text
+
+    def _current_signature(self):
+        backend = workbook_cache.backend
+        return (backend.signature(RECORD_FILE),
+                backend.signature(APPLICATION_FILE))
+
+    def get(self, target_date, levels=(), periods=()):
+        """Message for target_date, optionally only some levels/periods.
+
+        levels and periods are lowercase tuples such as ("l4", "l6");
+        empty means all.
+        """
+        key = (target_date, tuple(levels), tuple(periods))
+        signature = self._current_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._signature = signature
+                self._messages = {}
+            msg = self._messages.get(key)
+        if msg is not None:
+            return msg
+
+        shifts = load_approved_shifts(target_date)
+        if levels or periods:
+            chosen = [
+                s for s in shifts
+                if (not levels or str(s["level"]).lower() in levels) and
+                (not periods or str(s["shift"]).lower() in periods)
+            ]
+            # An empty selection on a working day is not a holiday
+            scope = " / ".join(x.upper() if x in levels else x.capitalize()
+                               for x in tuple(levels) + tuple(periods))
+            msg = build_duty_message(target_date, chosen,
+                                     scope=scope if shifts else None)
+        else:
+            msg = build_duty_message(target_date, shifts)
+
+        with self._lock:
+            # Keep it only if no write happened while it was being built
+            if signature == self._signature:
+                self._messages[key] = msg
+        return msg
+
+    def warm(self, *dates, filters=(((), ()), )):
+        """Build the messages ahead of time; filters are (levels, periods)."""
+        for d in dates:
+            for f in filters:
+                self.get(d, *f)
+
+
+duty_messages = DutyMessageCache()
@@ -1,12 +1,28 @@
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import ForceReply, InlineKeyboardButton, InlineKeyboardMarkup
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
+import calendar
+from startup import lazy_import
 
-from .data_reader import load_approved_shifts
-from .message_builder import build_duty_message
+from .duty_messages import duty_messages
+from .message_builder import (build_duty_message, build_name_choices,
+                              build_name_message)
+from .reminders import find_account, link_chat, unlink_chat
+from .search_index import get_search_index
+from .subscribers import parse_filters, subscribe, unsubscribe
+
+pd = lazy_import("pandas")
 
 SG_TZ = ZoneInfo("Asia/Singapore")
 
+# (chat id, user id) -> "date" / "name" while waiting for the search text
+awaiting_search = {}
+
+# The search prompts ask for a reply: in a group with privacy mode on, a
+# reply to the bot is the only ordinary message the bot gets to see
+def ask_reply():
+    return ForceReply(selective=True)
+
 def main_menu():
     keyboard = [
         [InlineKeyboardButton("Today", callback_data="today")],
@@ -20,12 +36,139 @@ def handle_menu(query, bot):
     today = datetime.now(SG_TZ).date()
 
     if query.data == "today":
-        shifts = load_approved_shifts(today)
-        msg = build_duty_message(today, shifts)
+        msg = duty_messages.get(today)
         bot.send_message(chat_id=query.message.chat_id, text=msg)
 
     elif query.data == "tomorrow":
         tmr = today + timedelta(days=1)
-        shifts = load_approved_shifts(tmr)
-        msg = build_duty_message(tmr, shifts)
+        msg = duty_messages.get(tmr)
         bot.send_message(chat_id=query.message.chat_id, text=msg)
+
+    elif query.data == "search_date":
+        awaiting_search[(query.message.chat_id, query.from_user.id)] = "date"
+        bot.send_message(chat_id=query.message.chat_id,
+                         text="Send a date, e.g. 27/02/2026",
+                         reply_markup=ask_reply())
+
+    elif query.data == "search_name":
+        awaiting_search[(query.message.chat_id, query.from_user.id)] = "name"
+        bot.send_message(chat_id=query.message.chat_id,
+                         text="Send a name (or part of it)",
+                         reply_markup=ask_reply())
+
+def handle_text(message, bot):
+    if message.from_user is None:
+        return
+    mode = awaiting_search.pop((message.chat_id, message.from_user.id), None)
+    if mode is None:
+        return  # ordinary chat message, not a search reply
+
+    text = (message.text or "").strip()
+    index = get_search_index()
+
+    if mode == "date":
+        # 27/02/2026 is day first; 2026-02-27 is not
+        day = pd.to_datetime(text, dayfirst=not text[:4].isdigit(),
+                             errors="coerce")
+        if pd.isna(day):
+            # Not waiting any more: the next message may be ordinary chat
+            bot.send_message(chat_id=message.chat_id,
+                             text="Could not read that date. Pick \"Search by "
+                                  "Date\" again and send e.g. 27/02/2026")
+            return
+        day = day.date()
+        msg = build_duty_message(day, index.on(day))
+
+    else:
+        names = index.find_names(text)
+        if len(names) > 1:
+            # Keep waiting for the name, sent in full this time
+            awaiting_search[(message.chat_id, message.from_user.id)] = "name"
+            bot.send_message(chat_id=message.chat_id,
+                             text=build_name_choices(text, names),
+                             reply_to_message_id=message.message_id,
+                             reply_markup=ask_reply())
+            return
+        if not names:
+            msg = build_name_choices(text, names)
+        else:
+            today = datetime.now(SG_TZ).date()
+            start = today.replace(day=1)
+            end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+            shifts = index.shifts_of(names[0], start, end)
+            if shifts:
+                msg = build_name_message(names[0], today.strftime("%B %Y"), shifts)
+            else:
+                # Nothing this month: show the latest ones on record instead
+                shifts = index.shifts_of(names[0])[-10:]
+                msg = build_name_message(names[0], "latest shifts on record",
+                                         shifts)
+
+    bot.send_message(chat_id=message.chat_id, text=msg)
+
+def _can_manage(message, bot):
+    if message.chat.type == "private":
+        return True
+    member = bot.get_chat_member(message.chat_id, message.from_user.id)
+    return member.status in ("administrator", "creator")
+
+def _topic_of(message):
+    return message.message_thread_id if message.is_topic_message else None
+
+def handle_subscribe(message, bot, args):
+    """/subscribe [L3 L4 L6] [morning afternoon night] in a chat or topic."""
+    if not _can_manage(message, bot):
+        bot.send_message(chat_id=message.chat_id,
+                         text="Only group admins can change notifications.")
+        return
+
+    filters = parse_filters(args)
+    if filters is None:
+        bot.send_message(chat_id=message.chat_id,
+                         text="Usage: /subscribe [L3 L4 L6] [morning afternoon night]")
+        return
+
+    levels, periods = filters
+    subscribe(message.chat_id, _topic_of(message), levels, periods)
+    scope = " ".join([x.upper() for x in levels] + list(periods)) or "all shifts"
+    bot.send_message(chat_id=message.chat_id,
+                     message_thread_id=_topic_of(message),
+                     text=f"Subscribed to daily duty notifications ({scope}).")
+
+def handle_unsubscribe(message, bot):
+    if not _can_manage(message, bot):
+        bot.send_message(chat_id=message.chat_id,
+                         text="Only group admins can change notifications.")
+        return
+
+    removed = unsubscribe(message.chat_id, _topic_of(message))
+    bot.send_message(chat_id=message.chat_id,
+                     message_thread_id=_topic_of(message),
+                     text="Unsubscribed." if removed else "This chat was not subscribed.")
+
+def handle_link(message, bot, args):
+    """/link <student id> <contact>: DM reminders before your own shifts."""
+    if message.chat.type != "private":
+        bot.send_message(chat_id=message.chat_id,
+                         text="Send /link to me in a private chat.")
+        return
+
+    if len(args) != 2:
+        bot.send_message(chat_id=message.chat_id,
+                         text="Usage: /link <student ID> <contact number>")
+        return
+
+    name = find_account(args[0], args[1])
+    if name is None:
+        bot.send_message(chat_id=message.chat_id,
+                         text="No account matches that ID and contact number.")
+        return
+
+    link_chat(message.chat_id, args[0].strip())
+    bot.send_message(chat_id=message.chat_id,
+                     text=f"Linked to {name}. You will get a reminder before each of your shifts.")
+
+def handle_unlink(message, bot):
+    removed = unlink_chat(message.chat_id)
+    bot.send_message(chat_id=message.chat_id,
+                     text="Reminders stopped." if removed else "This chat is not linked.")
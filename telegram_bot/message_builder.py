@@ -3,12 +3,15 @@ from datetime import date
 def is_weekend(d: date):
     return d.weekday() >= 5  # Sat/Sun
 
-def build_duty_message(target_date, shifts):
+def build_duty_message(target_date, shifts, scope=None):
     date_str = target_date.strftime("%d %b %Y (%A)")
 
     if is_weekend(target_date):
         return f"📌 {date_str}\n\nWeekend, ProjectHub closed."
 
+    if not shifts and scope:
+        return f"📌 {date_str}\n\nNo {scope} duty."
+
     if not shifts:
         return f"📌 {date_str}\n\nPublic Holiday, ProjectHub closed."
 
@@ -17,3 +20,29 @@ def build_duty_message(target_date, shifts):
         lines.append(f"• {s['name']} — {s['shift']} ({s['level']})")
 
     return "\n".join(lines)
+
+def build_name_message(name, period_label, shifts):
+    if not shifts:
+        return f"🔎 {name}\n\nNo approved shifts ({period_label})."
+
+    lines = [f"🔎 *{name}* — {period_label}\n"]
+    for s in shifts:
+        day = s["date"].strftime("%d %b %Y (%a)")
+        lines.append(f"• {day} — {s['shift']} ({s['level']})")
+
+    return "\n".join(lines)
+
+def build_name_choices(query, names):
+    if not names:
+        return f"No student coach found matching \"{query}\"."
+
+    lines = [f"Several names match \"{query}\", send one in full:\n"]
+    for n in names:
+        lines.append(f"• {n}")
+
+    return "\n".join(lines)
+
+def build_reminder_message(target_date, period, level, start):
+    day_str = target_date.strftime("%d %b (%A)")
+    return (f"⏰ Reminder: your {period.capitalize()} shift ({level.upper()}) "
+            f"starts at {start.strftime('%H:%M')} today, {day_str}.")
@@ -0,0 +1,181 @@
+# reminders.py
+import os
+import threading
+from datetime import datetime, time, timedelta
+
+from startup import lazy_import
+from storage.cache import workbook_cache
+from storage.excel_io import load_derived, load_excel_safe, save_excel_safe
+from storage.locks import excel_transaction
+
+from .data_reader import RECORD_FILE
+from .message_builder import build_reminder_message
+
+pd = lazy_import("pandas")
+
+ACCOUNT_FILE = os.path.join("data", "account.xlsx")
+LINK_FILE = os.path.join("data", "bot_links.xlsx")
+
+# How long before the shift starts the DM goes out
+REMINDER_LEAD = timedelta(minutes=int(os.getenv("REMINDER_LEAD_MINUTES", "60")))
+
+# Used when a record has no shiftstart of its own
+PERIOD_STARTS = {
+    "morning": time(9, 0),
+    "afternoon": time(14, 0),
+    "night": time(18, 0)
+}
+
+
+def _parse_time(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, time):
+        return value
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def build_shift_starts(df):
+    """{date: [(student id, shiftperiod, shiftlevel, start time), ...]}."""
+    starts = {}
+    if df.empty:
+        return starts
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+    if not {"id", "date", "shiftperiod"} <= set(df.columns):
+        return starts
+
+    days = pd.to_datetime(df["date"], errors="coerce").dt.date
+    ids = df["id"].astype(str).str.strip()
+    levels = df.get("shiftlevel", pd.Series("", index=df.index)).fillna("")
+    own = df.get("shiftstart", pd.Series(None, index=df.index))
+    for day, sid, period, level, start in zip(days, ids, df["shiftperiod"],
+                                              levels, own):
+        if pd.isna(day):
+            continue
+        period = str(period).strip()
+        start = _parse_time(start) or PERIOD_STARTS.get(period.lower())
+        if start is None:
+            continue
+        starts.setdefault(day, []).append((sid, period, str(level), start))
+    return starts
+
+
+def build_links(df):
+    """{student id: [chat id, ...]} from the link sheet."""
+    links = {}
+    if df.empty or "chat_id" not in df.columns:
+        return links
+    for chat_id, sid in zip(df["chat_id"], df["student_id"]):
+        if pd.isna(chat_id) or pd.isna(sid):
+            continue
+        links.setdefault(str(sid).strip(), []).append(int(chat_id))
+    return links
+
+
+def find_account(student_id, contact):
+    """Name of the account with this ID and contact number, else None."""
+    df = load_excel_safe(ACCOUNT_FILE)
+    if df.empty:
+        return None
+    df.columns = df.columns.str.strip().str.lower()
+    if not {"id", "contact"} <= set(df.columns):
+        return None
+    df = df.fillna("")
+    ids = df["id"].astype(str).str.strip()
+    contacts = df["contact"].astype(str).str.replace(".0", "", regex=False).str.strip()
+    match = df[(ids == str(student_id).strip()) & (contacts == str(contact).strip())]
+    if match.empty:
+        return None
+    return str(match.iloc[0].get("name", "")).strip()
+
+
+def link_chat(chat_id, student_id):
+    """Send student_id's reminders to chat_id (one student per chat)."""
+    with excel_transaction(LINK_FILE):
+        df = load_excel_safe(LINK_FILE)
+        if df.empty:
+            df = pd.DataFrame(columns=["chat_id", "student_id"])
+        df = df[df["chat_id"].astype(str) != str(chat_id)]
+        row = pd.DataFrame([{"chat_id": chat_id, "student_id": str(student_id)}])
+        save_excel_safe(pd.concat([df, row], ignore_index=True), LINK_FILE)
+
+
+def unlink_chat(chat_id):
+    """Stop reminders to chat_id; returns False if it was not linked."""
+    with excel_transaction(LINK_FILE):
+        df = load_excel_safe(LINK_FILE)
+        if df.empty:
+            return False
+        kept = df[df["chat_id"].astype(str) != str(chat_id)]
+        if len(kept) == len(df):
+            return False
+        save_excel_safe(kept, LINK_FILE)
+        return True
+
+
+class ReminderPlan:
+    """Today's reminders, worked out in one pass over the shift index.
+
+    refresh() rebuilds the list only when the day, the records or the
+    links change; due() hands out the reminders whose time has come. The
+    scheduler calls both from a single job, however many reminders there
+    are.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._pending = []  # [(send_at, chat_id, key, text)] sorted by time
+        self._sent = set()  # keys already sent today
+        self._day = None
+
+    def refresh(self, today):
+        backend = workbook_cache.backend
+        version = (today, backend.signature(RECORD_FILE),
+                   backend.signature(LINK_FILE))
+        with self._lock:
+            if version == self._version:
+                return
+
+        starts = load_derived(RECORD_FILE, build_shift_starts).get(today, [])
+        links = load_derived(LINK_FILE, build_links)
+
+        pending = []
+        for sid, period, level, start in starts:
+            for chat_id in links.get(sid, ()):
+                key = (chat_id, sid, period.lower(), level.lower())
+                send_at = datetime.combine(today, start) - REMINDER_LEAD
+                text = build_reminder_message(today, period, level, start)
+                pending.append((send_at, chat_id, key, text))
+        pending.sort(key=lambda p: p[0])
+
+        with self._lock:
+            if today != self._day:
+                self._day = today
+                self._sent = set()
+            self._pending = [p for p in pending if p[2] not in self._sent]
+            self._version = version
+
+    def due(self, now):
+        """[(chat_id, text)] to send at now (naive Singapore time).
+
+        Reminders for shifts that have already started are dropped, e.g.
+        after the bot was down for a while.
+        """
+        out = []
+        with self._lock:
+            while self._pending and self._pending[0][0] <= now:
+                send_at, chat_id, key, text = self._pending.pop(0)
+                self._sent.add(key)
+                if send_at + REMINDER_LEAD > now:
+                    out.append((chat_id, text))
+        return out
+
+
+reminder_plan = ReminderPlan()
@@ -3,4 +3,4 @@ from .bot import start_bot
 
 def run_bot():
     print("Telegram bot started")
-    start_bot()
+    return start_bot()
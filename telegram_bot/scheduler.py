@@ -1,48 +1,67 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
 import pytz
-from telegram import Bot
-import os
 
-from .data_reader import load_approved_shifts
-from .message_builder import build_duty_message
+from .broadcast import Broadcaster
+from .duty_messages import duty_messages
+from .reminders import reminder_plan
+from .subscribers import load_subscribers
 
 SG_TZ = pytz.timezone("Asia/Singapore")
 
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-CHAT_ID = int(os.getenv("CHAT_ID"))
-TOPIC_ID = int(os.getenv("TOPIC_ID"))
+bot = None  # the Updater's Bot, set by start_scheduler()
+broadcaster = Broadcaster()
 
-bot = Bot(token=BOT_TOKEN)
+def broadcast_duty(target_date):
+    # Every subscribed chat/topic, each with its own level/period filter
+    messages = [{
+        "chat_id": sub["chat_id"],
+        "message_thread_id": sub["topic_id"],
+        "text": duty_messages.get(target_date, sub["levels"], sub["periods"]),
+        "parse_mode": "Markdown"
+    } for sub in load_subscribers()]
+
+    sent = broadcaster.send_all(bot, messages)
+    print(f"Duty message for {target_date} sent to {sent}/{len(messages)} chats")
 
 def notify_today():
+    broadcast_duty(datetime.now(SG_TZ).date())
+
+def notify_tomorrow():
+    broadcast_duty(datetime.now(SG_TZ).date() + timedelta(days=1))
+
+def warm_messages():
     today = datetime.now(SG_TZ).date()
-    shifts = load_approved_shifts(today)
-    msg = build_duty_message(today, shifts)
+    filters = {((), ())} | {(sub["levels"], sub["periods"])
+                            for sub in load_subscribers()}
+    duty_messages.warm(today, today + timedelta(days=1), filters=filters)
 
-    bot.send_message(
-        chat_id=CHAT_ID,
-        message_thread_id=TOPIC_ID,
-        text=msg,
-        parse_mode="Markdown"
-    )
+def send_reminders():
+    # One job for every personal reminder: the plan is rebuilt only when
+    # the day, the records or the links change
+    now = datetime.now(SG_TZ).replace(tzinfo=None)
+    reminder_plan.refresh(now.date())
+    due = reminder_plan.due(now)
+    if due:
+        sent = broadcaster.send_all(bot, [{"chat_id": chat_id, "text": text}
+                                          for chat_id, text in due])
+        print(f"Shift reminders sent: {sent}/{len(due)}")
+
+def start_scheduler(telegram_bot):
+    global bot
+    bot = telegram_bot
 
-def notify_tomorrow():
-    tomorrow = datetime.now(SG_TZ).date() + timedelta(days=1)
-    shifts = load_approved_shifts(tomorrow)
-    msg = build_duty_message(tomorrow, shifts)
-
-    bot.send_message(
-        chat_id=CHAT_ID,
-        message_thread_id=TOPIC_ID,
-        text=msg,
-        parse_mode="Markdown"
-    )
-
-def start_scheduler():
     scheduler = BackgroundScheduler(timezone=SG_TZ)
 
+    # Render the messages ahead of the sends below (and the menu buttons)
+    scheduler.add_job(warm_messages, "cron", hour=11, minute=55)
+    scheduler.add_job(warm_messages, "cron", hour=17, minute=55)
+    scheduler.add_job(warm_messages, "cron", hour=0, minute=1)
+
     scheduler.add_job(notify_today, "cron", hour=12, minute=0)
     scheduler.add_job(notify_tomorrow, "cron", hour=18, minute=0)
 
+    scheduler.add_job(send_reminders, "cron", minute="*")
+
     scheduler.start()
+    scheduler.add_job(warm_messages)  # once, now, without delaying start-up
@@ -0,0 +1,148 @@
+# search_index.py
+import bisect
+import difflib
+import glob
+import os
+import re
+import threading
+import unicodedata
+
+from startup import lazy_import
+from storage.cache import workbook_cache
+from storage.excel_io import load_excel_safe
+
+from .data_reader import RECORD_FILE
+
+pd = lazy_import("pandas")
+
+# Older semesters; same columns as shift_record.xlsx
+HISTORY_GLOB = os.path.join("pastrecords", "data", "shift_record*.xlsx")
+
+
+def normalize_name(name):
+    """Lowercase, accents stripped, punctuation and extra spaces removed."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+
+class ShiftSearchIndex:
+    """Approved shifts sorted by date, plus a lookup by normalized name."""
+
+    def __init__(self, shifts):
+        # shifts: dicts with date, id, name, shift, level; sorted by date
+        self.shifts = shifts
+        self._dates = [s["date"] for s in shifts]
+        self._by_name = {}  # normalized name -> positions in self.shifts
+        self._display = {}  # normalized name -> name as stored
+        for pos, s in enumerate(shifts):
+            key = normalize_name(s["name"])
+            if key:
+                self._by_name.setdefault(key, []).append(pos)
+                self._display.setdefault(key, s["name"])
+        self._names = sorted(self._by_name)
+        self._words = {}  # word -> normalized names containing it
+        for key in self._names:
+            for word in key.split():
+                self._words.setdefault(word, []).append(key)
+
+    def on(self, day):
+        return self.between(day, day)
+
+    def between(self, start, end):
+        """Shifts with start <= date <= end."""
+        lo = bisect.bisect_left(self._dates, start)
+        hi = bisect.bisect_right(self._dates, end)
+        return self.shifts[lo:hi]
+
+    def find_names(self, query, limit=5):
+        """Stored names matching query: exact, then prefix, then fuzzy."""
+        q = normalize_name(query)
+        if not q:
+            return []
+        if q in self._by_name:
+            return [self._display[q]]
+
+        # Whole-name prefix via the sorted list, then any word of the name
+        found = []
+        pos = bisect.bisect_left(self._names, q)
+        while pos < len(self._names) and self._names[pos].startswith(q):
+            found.append(self._names[pos])
+            pos += 1
+        words = q.split()
+        for key in self._names:
+            if key not in found and all(
+                    any(part.startswith(w) for part in key.split())
+                    for w in words):
+                found.append(key)
+
+        if not found:
+            # Typos: match whole names, then single words ("lucas" -> "lukas")
+            found = difflib.get_close_matches(q, self._names, n=limit,
+                                              cutoff=0.6)
+            for word in difflib.get_close_matches(q, list(self._words),
+                                                  n=limit, cutoff=0.75):
+                found += [k for k in self._words[word] if k not in found]
+        return [self._display[key] for key in found[:limit]]
+
+    def shifts_of(self, name, start=None, end=None):
+        positions = self._by_name.get(normalize_name(name), [])
+        shifts = [self.shifts[p] for p in positions]
+        if start is not None:
+            shifts = [s for s in shifts if s["date"] >= start]
+        if end is not None:
+            shifts = [s for s in shifts if s["date"] <= end]
+        return shifts
+
+
+def _shift_rows(df):
+    if df.empty:
+        return []
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+    blank = pd.Series("", index=df.index)
+
+    rows = pd.DataFrame({
+        "date": pd.to_datetime(df.get("date"), errors="coerce").dt.date,
+        "id": df.get("id", blank).astype(str).str.strip(),
+        "name": df.get("name", blank).fillna("").astype(str).str.strip(),
+        "shift": df.get("shiftperiod", blank).fillna("").astype(str),
+        "level": df.get("shiftlevel", blank).fillna("").astype(str)
+    }).dropna(subset=["date"])
+    return rows.to_dict("records")
+
+
+_lock = threading.Lock()
+_cached = (None, None)  # (signature, ShiftSearchIndex)
+
+
+def get_search_index():
+    """Index over shift_record.xlsx and the history files.
+
+    Rebuilt only when one of the files (or the set of files) changes.
+    """
+    global _cached
+    paths = [RECORD_FILE] + sorted(glob.glob(HISTORY_GLOB))
+    backend = workbook_cache.backend
+    signature = tuple((p, backend.signature(p)) for p in paths)
+
+    with _lock:
+        if _cached[0] == signature:
+            return _cached[1]
+
+    # The same shift is often present in several files
+    seen = set()
+    shifts = []
+    for path in paths:
+        for row in _shift_rows(load_excel_safe(path)):
+            key = (row["id"], row["date"], row["shift"].lower(),
+                   row["level"].lower())
+            if key not in seen:
+                seen.add(key)
+                shifts.append(row)
+    shifts.sort(key=lambda s: s["date"])
+
+    index = ShiftSearchIndex(shifts)
+    with _lock:
+        _cached = (signature, index)
+    return index
@@ -0,0 +1,116 @@
+# subscribers.py
+import os
+
+from startup import lazy_import
+from storage.excel_io import load_derived, load_excel_safe, save_excel_safe
+from storage.locks import excel_transaction
+
+pd = lazy_import("pandas")
+
+SUBSCRIBER_FILE = os.path.join("data", "bot_subscribers.xlsx")
+SUBSCRIBER_COLUMNS = ["chat_id", "topic_id", "levels", "periods"]
+
+LEVELS = ("l3", "l4", "l6")
+PERIODS = ("morning", "afternoon", "night")
+
+
+def _split(value):
+    # "L3, L4" -> ("l3", "l4"); blank -> () meaning "all"
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ()
+    return tuple(sorted(p.strip().lower() for p in str(value).split(",")
+                        if p.strip()))
+
+
+def _optional_int(value):
+    if value is None or pd.isna(value) or str(value).strip() == "":
+        return None
+    return int(float(value))
+
+
+def parse_subscribers(df):
+    """Rows of the subscriber sheet as dicts with parsed filters."""
+    subs = []
+    if df.empty or "chat_id" not in df.columns:
+        return subs
+    for row in df.to_dict("records"):
+        chat_id = _optional_int(row.get("chat_id"))
+        if chat_id is None:
+            continue
+        subs.append({
+            "chat_id": chat_id,
+            "topic_id": _optional_int(row.get("topic_id")),
+            "levels": _split(row.get("levels")),
+            "periods": _split(row.get("periods"))
+        })
+    return subs
+
+
+def load_subscribers():
+    """Every chat/topic that receives the scheduled notifications.
+
+    Falls back to the CHAT_ID/TOPIC_ID environment variables when nobody
+    has subscribed yet.
+    """
+    subs = load_derived(SUBSCRIBER_FILE, parse_subscribers)
+    if subs:
+        return subs
+    if os.getenv("CHAT_ID"):
+        return [{
+            "chat_id": int(os.getenv("CHAT_ID")),
+            "topic_id": _optional_int(os.getenv("TOPIC_ID")),
+            "levels": (),
+            "periods": ()
+        }]
+    return []
+
+
+def parse_filters(words):
+    """Split "/subscribe L4 night" arguments into (levels, periods).
+
+    Returns None if a word is neither a level nor a period.
+    """
+    levels, periods = [], []
+    for w in (w.strip().lower() for w in words):
+        if w in LEVELS:
+            levels.append(w)
+        elif w in PERIODS:
+            periods.append(w)
+        else:
+            return None
+    return tuple(sorted(set(levels))), tuple(sorted(set(periods)))
+
+
+def subscribe(chat_id, topic_id, levels=(), periods=()):
+    """Add or update the subscription of a chat/topic."""
+    with excel_transaction(SUBSCRIBER_FILE):
+        df = _without(load_excel_safe(SUBSCRIBER_FILE), chat_id, topic_id)
+        row = pd.DataFrame([{
+            "chat_id": chat_id,
+            "topic_id": topic_id if topic_id is not None else "",
+            "levels": ",".join(levels),
+            "periods": ",".join(periods)
+        }])
+        save_excel_safe(pd.concat([df, row], ignore_index=True),
+                        SUBSCRIBER_FILE)
+
+
+def unsubscribe(chat_id, topic_id):
+    """Remove a chat/topic; returns False if it was not subscribed."""
+    with excel_transaction(SUBSCRIBER_FILE):
+        df = load_excel_safe(SUBSCRIBER_FILE)
+        kept = _without(df, chat_id, topic_id)
+        if len(kept) == len(df):
+            return False
+        save_excel_safe(kept, SUBSCRIBER_FILE)
+        return True
+
+
+def _without(df, chat_id, topic_id):
+    if df.empty:
+        return pd.DataFrame(columns=SUBSCRIBER_COLUMNS)
+    same = [
+        _optional_int(c) == chat_id and _optional_int(t) == topic_id
+        for c, t in zip(df["chat_id"], df.get("topic_id", [None] * len(df)))
+    ]
+    return df[[not s for s in same]]
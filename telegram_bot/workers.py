@@ -0,0 +1,50 @@
+# workers.py
+import os
+import threading
+from collections import deque
+
+from telegram.utils.request import Request
+
+# Threads handling updates concurrently (Updater workers)
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "8"))
+
+
+def make_request():
+    """Pooled HTTP connections, enough for every worker to send at once."""
+    return Request(con_pool_size=BOT_WORKERS + 4)
+
+
+class ChatQueue:
+    """Runs handlers on a worker pool, in arrival order within each chat.
+
+    Different chats are served concurrently, so one slow update only
+    delays the chat it came from.
+    """
+
+    def __init__(self, submit):
+        self._submit = submit  # submit(func, *args) runs func on the pool
+        self._lock = threading.Lock()
+        self._pending = {}  # chat_id -> deque of (func, args)
+
+    def put(self, chat_id, func, *args):
+        with self._lock:
+            queue = self._pending.get(chat_id)
+            if queue is not None:
+                # A worker is already draining this chat
+                queue.append((func, args))
+                return
+            self._pending[chat_id] = deque([(func, args)])
+        self._submit(self._drain, chat_id)
+
+    def _drain(self, chat_id):
+        while True:
+            with self._lock:
+                queue = self._pending[chat_id]
+                if not queue:
+                    del self._pending[chat_id]
+                    return
+                func, args = queue.popleft()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[ChatQueue] Handler failed for chat {chat_id}: {e}")
@@ -1,20 +1,41 @@
 # Basic Flask App Setup
+import startup  # first, so the startup report covers every import below
 from flask import (send_from_directory, Flask, render_template, request,
                    redirect, url_for, session, jsonify, flash,
                    get_flashed_messages)
-import pandas as pd
 import os
-from calendar import monthrange, Calendar
 from datetime import datetime, date, timedelta
-import calendar
-from collections import defaultdict
-import tempfile
-import shutil
 from zoneinfo import ZoneInfo
 from werkzeug.utils import secure_filename
 import base64
 import pytz
 
+from roster.account_totals import AccountTotalsWorker
+from roster.allocation import check_allocation, propose_allocation
+from roster.append_index import AppendIndex
+from roster.attendance import (add_clock_event, build_clock_events,
+                               build_record_clock_times, fold_clock_events,
+                               merge_clock_times)
+from roster.eligibility import eligibility_matrix
+from roster.indexes import (add_verified_key, build_account_flags,
+                            build_application_index,
+                            build_applications_by_month, build_approved_by_month,
+                            build_applications_by_student, build_record_index,
+                            build_records_by_month, build_verified_keys,
+                            shift_key)
+from roster.month_calendar import group_by_date, month_grid, month_weeks
+from roster.page_snapshots import PageSnapshots
+from roster.slots import missing_month_slots
+from storage.backends import get_backend
+from storage.cache import workbook_cache
+from storage.excel_io import (append_excel_rows, delete_excel_rows,
+                              load_derived, load_excel_safe, save_excel_safe,
+                              update_excel_rows)
+from storage.locks import excel_transaction
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
 # Initialize App
 app = Flask(__name__)
 app.secret_key = "replace_this_with_a_secure_key"
@@ -32,6 +53,12 @@ SLOT_FILE = os.path.join(DATA_FOLDER, "slot_control.xlsx")
 APPLICATION_FILE = os.path.join(DATA_FOLDER, "shift_application.xlsx")
 RECORD_FILE = os.path.join(DATA_FOLDER, "shift_record.xlsx")
 VERIFY_FILE = os.path.join(DATA_FOLDER, "shift_verify.xlsx")
+ATTENDANCE_FILE = os.path.join(DATA_FOLDER, "attendance_events.xlsx")
+
+# Columns that pick out one stored slot / application for keyed writes
+SLOT_KEY = ("date", "shiftperiod", "shiftlevel")
+APPLICATION_KEY = ("timestamp", "id", "date", "shiftperiod", "shiftlevel")
+RECORD_KEY = ("id", "date", "shiftperiod", "shiftlevel")
 
 
 def format_timestamp(val):
@@ -43,39 +70,12 @@ def format_timestamp(val):
         return str(val)
 
 
-# Excel Helper
-def load_excel_safe(filepath):
-    if not os.path.exists(filepath):
-        return pd.DataFrame()
-    try:
-        df = pd.read_excel(filepath, engine="openpyxl")
-        # Normalize columns: lowercase and strip
-        df.columns = df.columns.astype(str).str.strip()
-        return df
-    except Exception as e:
-        print(f"[load_excel_safe] Error reading {filepath}: {e}")
-        return pd.DataFrame()
-
-
-def save_excel_safe(df: pd.DataFrame, filepath: str):
-    if df is None:
-        raise ValueError("[save_excel_safe] DataFrame is None")
-    directory = os.path.dirname(filepath) or "."
-    os.makedirs(directory, exist_ok=True)
-    if not filepath.lower().endswith(".xlsx"):
-        filepath += ".xlsx"
-    with tempfile.NamedTemporaryFile(mode="w+b",
-                                     suffix=".xlsx",
-                                     dir=directory,
-                                     delete=False) as tmp:
-        temp_path = tmp.name
-    try:
-        df.to_excel(temp_path, index=False, engine="openpyxl")
-        shutil.move(temp_path, filepath)
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise RuntimeError(f"[save_excel_safe] Failed saving {filepath}: {e}")
+# update_excel_rows/delete_excel_rows keys of some rows of a loaded
+# workbook: (key columns it has, [stored values of each row])
+def stored_row_keys(df, rows, key):
+    columns = tuple(c for c in key if c in df.columns)
+    return columns, list(df.loc[rows, list(columns)].itertuples(index=False,
+                                                               name=None))
 
 
 # Normalize account.xlsx
@@ -358,55 +358,15 @@ def admin_slot_control():
     slot_df_month = slot_df[(slot_df["date"].dt.year == year)
                             & (slot_df["date"].dt.month == month)].copy()
 
-    # --- Auto-create missing slots ---
-    shift_types = ["Morning", "Afternoon", "Night"]
-    shift_levels = ["L3", "L4", "L6"]
-    first_day = datetime(year, month, 1)
-    last_day = datetime(year, month, calendar.monthrange(year, month)[1])
-    all_dates = pd.date_range(first_day, last_day)
-
-    new_rows = []
-    for d in all_dates:
-        for stype in shift_types:
-            for slevel in shift_levels:
-                # Check if slot already exists
-                exists = ((slot_df_month["date"] == d) &
-                          (slot_df_month["shiftperiod"] == stype) &
-                          (slot_df_month["shiftlevel"] == slevel)).any()
-                if not exists:
-                    new_rows.append({
-                        "month": f"{year}-{month:02d}",
-                        "date": d,
-                        "day": d.strftime("%A"),
-                        "shiftperiod": stype,
-                        "shiftlevel": slevel,
-                        "approvedshift": 0,
-                        "isopen": 0,
-                        "remarks": "",
-                        "onjobtrain": 0,
-                        "nightshift": 1 if stype == "Night" else 0
-                    })
-
-    # Append new slots if any
-    if new_rows:
-        slot_df = pd.concat([slot_df, pd.DataFrame(new_rows)],
-                            ignore_index=True)
-        # Remove duplicate columns just in case
-        slot_df = slot_df.loc[:, ~slot_df.columns.duplicated()]
-        save_excel_safe(slot_df, SLOT_FILE)
-        slot_df_month = slot_df[(slot_df["date"].dt.year == year)
-                                & (slot_df["date"].dt.month == month)].copy()
+    # --- Show missing slots with default settings (not saved) ---
+    # They are written by materialize_month_slots() the first time one of
+    # them is edited, so viewing the page never writes
+    missing = missing_month_slots(slot_df, year, month)
+    if not missing.empty:
+        slot_df_month = pd.concat([slot_df_month, missing], ignore_index=True)
 
     # --- Build calendar (Monday first) ---
-    cal = calendar.Calendar(firstweekday=calendar.MONDAY)
-    weeks = []
-    for week in cal.monthdatescalendar(year, month):
-        week_data = []
-        for d in week:
-            shifts = slot_df_month[slot_df_month["date"] == pd.Timestamp(
-                d)].to_dict("records") if d.month == month else []
-            week_data.append({"date": d, "shifts": shifts})
-        weeks.append(week_data)
+    weeks = month_weeks(year, month, group_by_date(slot_df_month))
 
     return render_template("admin_slot_control.html",
                            view=view_type,
@@ -418,6 +378,34 @@ def admin_slot_control():
                            today=date.today())
 
 
+# Save the default slots a month is still missing; returns how many
+def materialize_month_slots(year, month):
+    with excel_transaction(SLOT_FILE):
+        slot_df = load_excel_safe(SLOT_FILE)
+        if not slot_df.empty:
+            slot_df["date"] = pd.to_datetime(slot_df["date"], errors="coerce")
+        missing = missing_month_slots(slot_df, year, month)
+        append_excel_rows(SLOT_FILE, missing.to_dict("records"))
+    return len(missing)
+
+
+# Admin: create all slots of a month
+@app.route("/admin/slot_control/materialize", methods=["POST"])
+def materialize_slots():
+    user = session.get("user")
+    if not user or user.get("role") != "admin":
+        return jsonify(success=False, error="Unauthorized"), 403
+    try:
+        month = int(request.form.get("month", datetime.today().month))
+        year = int(request.form.get("year", datetime.today().year))
+    except ValueError:
+        return jsonify(success=False, error="Invalid month"), 400
+    if not 1 <= month <= 12:
+        return jsonify(success=False, error="Invalid month"), 400
+
+    return jsonify(success=True, created=materialize_month_slots(year, month))
+
+
 # Admin slot control update
 @app.route("/admin/slot_control/update", methods=["POST"])
 def update_shift():
@@ -436,29 +424,31 @@ def update_shift():
     nightShift = to_int(request.form.get("nightShift"))
     remarks = request.form.get("remarks", "")
 
-    slot_df = load_excel_safe(SLOT_FILE)
-    slot_df.columns = slot_df.columns.astype(str).str.strip()
-
-    # Normalize date
-    target_date = pd.to_datetime(date_str).normalize()
-    slot_df["date"] = pd.to_datetime(slot_df["date"],
-                                     errors="coerce").dt.normalize()
+    with excel_transaction(SLOT_FILE):
+        # Normalize date
+        target_date = pd.to_datetime(date_str).normalize()
 
-    # Create mask
-    mask = ((slot_df["date"] == target_date) &
-            (slot_df["shiftperiod"] == shiftPeriod) &
-            (slot_df["shiftlevel"] == shiftLevel))
+        # The page also lists slots not saved yet; create the month first
+        materialize_month_slots(target_date.year, target_date.month)
 
-    if not mask.any():
-        return jsonify({"success": False, "error": "Slot not found"}), 404
+        slot_df = load_excel_safe(SLOT_FILE)
 
-    # Update slot
-    slot_df.loc[mask, "isopen"] = isOpen
-    slot_df.loc[mask, "onjobtrain"] = onjobtrain
-    slot_df.loc[mask, "nightshift"] = nightShift
-    slot_df.loc[mask, "remarks"] = remarks
+        # Create mask
+        mask = ((pd.to_datetime(slot_df["date"],
+                                errors="coerce").dt.normalize() == target_date) &
+                (slot_df["shiftperiod"] == shiftPeriod) &
+                (slot_df["shiftlevel"] == shiftLevel))
 
-    save_excel_safe(slot_df, SLOT_FILE)
+        if not mask.any():
+            return jsonify({"success": False, "error": "Slot not found"}), 404
+
+        # Update only the slot's row(s)
+        key, rows = stored_row_keys(slot_df, mask, SLOT_KEY)
+        update_excel_rows(SLOT_FILE, key, {
+            k: {"isopen": isOpen, "onjobtrain": onjobtrain,
+                "nightshift": nightShift, "remarks": remarks}
+            for k in rows
+        })
 
     return jsonify({
         "success": True,
@@ -468,80 +458,74 @@ def update_shift():
     })
 
 
-# Update totalApprovedShift and totalPendingShift
-def recalculate_account_shift_totals():
-
-    # Load Excel files safely
-    app_df = load_excel_safe(APPLICATION_FILE)
-    acc_df = load_excel_safe(ACCOUNT_FILE)
-
-    if app_df.empty or acc_df.empty:
-        print("Skipping totals update — empty Excel")
-        return
-
-    # --- Normalize columns ---
+# Approved / pending application counts per student ID
+def count_shift_totals(app_df):
+    app_df = app_df.copy()
     app_df.columns = app_df.columns.str.strip().str.lower()
-    acc_df.columns = acc_df.columns.str.strip()
+    blank = pd.Series("", index=app_df.index)
 
-    app_df["id"] = app_df["id"].astype(str).str.strip()
-    app_df["admindecision"] = app_df.get("admindecision",
-                                         "").astype(str).str.lower()
-    app_df["status"] = app_df.get("status", "").astype(str).str.lower()
+    ids = app_df["id"].astype(str).str.strip()
+    decision = app_df.get("admindecision", blank).astype(str).str.lower()
+    status = app_df.get("status", blank).astype(str).str.lower()
 
-    acc_df["ID"] = acc_df["ID"].astype(str).str.strip()
+    approved = ids[decision == "approved"].value_counts()
+    pending = ids[status == "pending"].value_counts()
+    return approved, pending
 
-    # --- Reset totals ---
-    acc_df["totalApprovedShift"] = 0
-    acc_df["totalPendingShift"] = 0
 
-    # --- Count per user ---
-    for user_id in acc_df["ID"]:
-        approved_count = ((app_df["id"] == user_id) &
-                          (app_df["admindecision"] == "approved")).sum()
-        pending_count = ((app_df["id"] == user_id) &
-                         (app_df["status"] == "pending")).sum()
-
-        acc_df.loc[acc_df["ID"] == user_id,
-                   "totalApprovedShift"] = approved_count
-        acc_df.loc[acc_df["ID"] == user_id,
-                   "totalPendingShift"] = pending_count
-
-    # --- Save safely ---
-    save_excel_safe(acc_df, ACCOUNT_FILE)
-    print("ACCOUNT_FILE totals updated successfully")
+# Update totalApprovedShift and totalPendingShift
+# user_ids given: only those accounts are updated (a booking or decision
+# only ever changes its own student's totals)
+def recalculate_account_shift_totals(user_ids=None):
 
+    # Load Excel files safely. Applications are read before the account
+    # lock is taken so lock order stays APPLICATION -> ACCOUNT everywhere
+    app_df = load_excel_safe(APPLICATION_FILE)
+    if app_df.empty or "id" not in app_df.columns.str.lower():
+        print("Skipping totals update — empty Excel")
+        return
 
-# --- Eligibility check function ---
-def check_booking_eligibility(user, slot):
+    approved, pending = count_shift_totals(app_df)
+
+    # --- Delta update for the affected students only ---
+    if user_ids is not None:
+        update_excel_rows(
+            ACCOUNT_FILE, "ID", {
+                uid: {
+                    "totalApprovedShift": int(approved.get(uid, 0)),
+                    "totalPendingShift": int(pending.get(uid, 0))
+                }
+                for uid in {str(u).strip() for u in user_ids}
+            })
+        return
 
-    eligible = True
-    reasons = []
+    with excel_transaction(ACCOUNT_FILE):
+        acc_df = load_excel_safe(ACCOUNT_FILE)
 
-    user_onjob = int(user.get("onjobtrain", 0))
-    user_night = int(user.get("nightShift", 0))
+        if acc_df.empty:
+            print("Skipping totals update — empty Excel")
+            return
 
-    slot_onjob = int(slot.get("onjobtrain", 0))
-    slot_night = int(slot.get("nightshift", 0))
+        acc_df["ID"] = acc_df["ID"].astype(str).str.strip()
 
-    # OJT-only slot
-    if slot_onjob == 1 and slot_night == 0:
-        if user_onjob != 1:
-            eligible = False
-            reasons.append("OJT required")
+        # --- Map counts onto every account in one pass ---
+        acc_df["totalApprovedShift"] = acc_df["ID"].map(approved).fillna(
+            0).astype(int)
+        acc_df["totalPendingShift"] = acc_df["ID"].map(pending).fillna(
+            0).astype(int)
 
-    # Night-only slot
-    elif slot_night == 1 and slot_onjob == 0:
-        if user_night != 1:
-            eligible = False
-            reasons.append("Night shift eligibility required")
+        # --- Save safely ---
+        save_excel_safe(acc_df, ACCOUNT_FILE)
+    print("ACCOUNT_FILE totals updated successfully")
 
-    # OJT + Night slot
-    elif slot_onjob == 1 and slot_night == 1:
-        if user_onjob != 1 and user_night != 1:
-            eligible = False
-            reasons.append("OJT or Night shift required")
 
-    return eligible, "; ".join(reasons)
+# Totals changed by bookings/decisions are recomputed in batches; admin
+# pages that display them flush first. The pending ids are kept beside the
+# account workbook so every worker process sees them
+account_totals = AccountTotalsWorker(
+    recalculate_account_shift_totals,
+    ACCOUNT_FILE + ".dirty",
+    interval=float(os.environ.get("ACCOUNT_TOTALS_INTERVAL", 5)))
 
 
 # Student coach shift booking page
@@ -563,8 +547,12 @@ def student_coach_shifts():
     # Load Excel safely
     # -----------------------------
     slot_df = load_excel_safe(SLOT_FILE)
-    app_df = load_excel_safe(APPLICATION_FILE)
-    rec_df = load_excel_safe(RECORD_FILE)
+
+    # Status lookups: hash indexes rebuilt only when the files change
+    app_index = load_derived(APPLICATION_FILE, build_application_index)
+    rec_index = load_derived(RECORD_FILE, build_record_index)
+    apps_by_student = load_derived(APPLICATION_FILE,
+                                   build_applications_by_student)
 
     # -----------------------------
     # Normalize SLOT
@@ -579,36 +567,6 @@ def student_coach_shifts():
     slot_df["date"] = pd.to_datetime(slot_df.get("date"),
                                      errors="coerce").dt.date
 
-    # -----------------------------
-    # Normalize APPLICATION
-    # -----------------------------
-    app_df.columns = app_df.columns.str.strip().str.lower()
-
-    required_cols = [
-        "timestamp", "id", "name", "month", "date", "day", "shiftperiod",
-        "shiftlevel", "status", "admindecision", "adminremarks",
-        "cancelrequest"
-    ]
-    for col in required_cols:
-        if col not in app_df.columns:
-            app_df[col] = ""
-
-    app_df["id"] = app_df["id"].astype(str)
-    app_df["date"] = pd.to_datetime(app_df["date"], errors="coerce").dt.date
-
-    # NEVER NaN TIMESTAMP
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    app_df["timestamp"] = (app_df["timestamp"].astype(str).replace(
-        "nan", "").replace("", now_str).fillna(now_str))
-
-    # -----------------------------
-    # Normalize RECORD
-    # -----------------------------
-    rec_df.columns = rec_df.columns.str.strip().str.lower()
-    rec_df["id"] = rec_df.get("id", "").astype(str)
-    rec_df["date"] = pd.to_datetime(rec_df.get("date"),
-                                    errors="coerce").dt.date
-
     # -----------------------------
     # FILTER SLOT MONTH (OPEN ONLY)
     # -----------------------------
@@ -619,85 +577,61 @@ def student_coach_shifts():
     # -----------------------------
     # INCLUDE OLD APPLICATIONS EVEN IF SLOT MISSING
     # -----------------------------
-    user_apps = app_df[(app_df["id"] == sid) & (app_df["date"].notna()) & (
-        app_df["date"].apply(lambda d: d.year == year and d.month == month))]
-
-    for _, row in user_apps.iterrows():
-        exists = ((slot_df["date"] == row["date"]) &
-                  (slot_df["shiftperiod"] == row["shiftperiod"]) &
-                  (slot_df["shiftlevel"] == row["shiftlevel"]))
-        if not exists.any():
-            slot_df = pd.concat([
-                slot_df,
-                pd.DataFrame([{
-                    "date": row["date"],
-                    "shiftperiod": row["shiftperiod"],
-                    "shiftlevel": row["shiftlevel"],
-                    "isopen": 0,
-                    "onjobtrain": 0,
-                    "nightshift": 0
-                }])
-            ],
-                                ignore_index=True)
+    slot_keys = {
+        shift_key(sid, d, p, l)
+        for d, p, l in zip(slot_df["date"], slot_df["shiftperiod"],
+                           slot_df["shiftlevel"])
+    }
+    missing = []
+    for d, p, l in apps_by_student.get(sid, []):
+        key = shift_key(sid, d, p, l)
+        if d.year == year and d.month == month and key not in slot_keys:
+            slot_keys.add(key)
+            missing.append({
+                "date": d,
+                "shiftperiod": p,
+                "shiftlevel": l,
+                "isopen": 0,
+                "onjobtrain": 0,
+                "nightshift": 0
+            })
+    if missing:
+        slot_df = pd.concat([slot_df, pd.DataFrame(missing)],
+                            ignore_index=True)
+
+    # -----------------------------
+    # ELIGIBILITY (whole month at once)
+    # -----------------------------
+    result = eligibility_matrix(pd.DataFrame([user]), slot_df)
+    slot_df["iseligible"] = result.eligible.iloc[0].to_numpy()
+    slot_df["reason"] = result.reasons.iloc[0].to_numpy()
 
     # -----------------------------
     # BUILD CALENDAR
     # -----------------------------
-    cal = calendar.Calendar(firstweekday=calendar.MONDAY)
-    weeks = []
-
-    for week in cal.monthdatescalendar(year, month):
-        week_days = []
-        for d in week:
-            day_shifts = []
-
-            shifts = slot_df[slot_df["date"] == d]
-
-            for _, slot in shifts.iterrows():
-                eligible = True
-                reasons = []
-
-                slot_ojt = int(slot.get("onjobtrain", 0))
-                slot_night = int(slot.get("nightshift", 0))
-                user_ojt = int(user.get("onjobtrain", 0))
-                user_night = int(user.get("nightShift", 0))
-
-                if slot_night == 1 and slot_ojt == 0 and user_night != 1:
-                    eligible = False
-                    reasons.append("Night shift eligibility required")
-                elif slot_ojt == 1 and slot_night == 0 and user_ojt != 1 and user_night != 1:
-                    eligible = False
-                    reasons.append("OJT or night eligibility required")
-                elif slot_ojt == 1 and slot_night == 1 and user_ojt != 1 and user_night != 1:
-                    eligible = False
-                    reasons.append("OJT or night eligibility required")
-
-                status = "open"
-
-                app = app_df[(app_df["id"] == sid) & (app_df["date"] == d) &
-                             (app_df["shiftperiod"] == slot["shiftperiod"]) &
-                             (app_df["shiftlevel"] == slot["shiftlevel"])]
-
-                rec = rec_df[(rec_df["id"] == sid) & (rec_df["date"] == d) &
-                             (rec_df["shiftperiod"] == slot["shiftperiod"]) &
-                             (rec_df["shiftlevel"] == slot["shiftlevel"])]
-
-                if not rec.empty:
-                    status = "approved"
-                elif not app.empty:
-                    status = app.iloc[0]["status"].lower()
-
-                day_shifts.append({
-                    "shiftperiod": slot["shiftperiod"],
-                    "shiftlevel": slot["shiftlevel"],
-                    "status": status,
-                    "iseligible": eligible,
-                    "reason": "; ".join(reasons),
-                    "date": d
-                })
-
-            week_days.append({"date": d, "shifts": day_shifts})
-        weeks.append(week_days)
+    shifts_by_date = {}
+    for d, slots in group_by_date(slot_df).items():
+        day_shifts = shifts_by_date[d] = []
+
+        for slot in slots:
+            status = "open"
+
+            key = shift_key(sid, d, slot["shiftperiod"], slot["shiftlevel"])
+            if key in rec_index:
+                status = "approved"
+            elif key in app_index:
+                status = app_index[key]
+
+            day_shifts.append({
+                "shiftperiod": slot["shiftperiod"],
+                "shiftlevel": slot["shiftlevel"],
+                "status": status,
+                "iseligible": bool(slot["iseligible"]),
+                "reason": slot["reason"],
+                "date": d
+            })
+
+    weeks = month_weeks(year, month, shifts_by_date)
 
     return render_template("student_coach_shift.html",
                            user=user,
@@ -731,87 +665,97 @@ def student_coach_shift_action():
 
         sid = str(user["id"])
 
-        slot_df = load_excel_safe(SLOT_FILE)
-        app_df = load_excel_safe(APPLICATION_FILE)
-
-        slot_df.columns = slot_df.columns.str.strip().str.lower()
-        slot_df["date"] = pd.to_datetime(slot_df["date"],
-                                         errors="coerce").dt.date
-
-        for col in ["onjobtrain", "nightshift"]:
-            if col not in slot_df.columns:
-                slot_df[col] = 0
-            slot_df[col] = slot_df[col].fillna(0).astype(int)
-
-        app_df.columns = app_df.columns.str.strip().str.lower()
+        with excel_transaction(APPLICATION_FILE):
+            slot_df = load_excel_safe(SLOT_FILE)
+            stored = load_excel_safe(APPLICATION_FILE)
+            app_df = stored.copy()
+
+            slot_df.columns = slot_df.columns.str.strip().str.lower()
+            slot_df["date"] = pd.to_datetime(slot_df["date"],
+                                             errors="coerce").dt.date
+
+            for col in ["onjobtrain", "nightshift"]:
+                if col not in slot_df.columns:
+                    slot_df[col] = 0
+                slot_df[col] = slot_df[col].fillna(0).astype(int)
+
+            app_df.columns = app_df.columns.str.strip().str.lower()
+
+            required_cols = [
+                "timestamp", "id", "name", "month", "date", "day", "shiftperiod",
+                "shiftlevel", "status", "admindecision", "adminremarks",
+                "cancelrequest"
+            ]
+            for col in required_cols:
+                if col not in app_df.columns:
+                    app_df[col] = ""
+
+            app_df["id"] = app_df["id"].astype(str)
+            app_df["date"] = pd.to_datetime(app_df["date"],
+                                            errors="coerce").dt.date
+
+            now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            app_df["timestamp"] = (app_df["timestamp"].astype(str).replace(
+                "nan", "").replace("", now_str).fillna(now_str))
+
+            existing_app = app_df[(app_df["id"] == sid)
+                                  & (app_df["date"] == shift_date) &
+                                  (app_df["shiftperiod"] == shift_period) &
+                                  (app_df["shiftlevel"] == shift_level)]
+
+            if action == "book":
+                if not existing_app.empty:
+                    return jsonify(success=False,
+                                   error="You already booked this shift"), 400
+
+                slot = slot_df[(slot_df["date"] == shift_date) &
+                               (slot_df["shiftperiod"] == shift_period) &
+                               (slot_df["shiftlevel"] == shift_level)]
+                if not slot.empty:
+                    result = eligibility_matrix(pd.DataFrame([user]), slot.head(1))
+                    if not result.eligible.iat[0, 0]:
+                        return jsonify(success=False,
+                                       error=result.reasons.iat[0, 0]), 400
+
+                new_app = {
+                    "timestamp": now_str,
+                    "id": sid,
+                    "name": user["name"],
+                    "month": shift_date.strftime("%Y-%m"),
+                    "date": shift_date.strftime("%Y-%m-%d"),
+                    "day": shift_date.strftime("%A"),
+                    "shiftperiod": shift_period,
+                    "shiftlevel": shift_level,
+                    "status": "pending",
+                    "admindecision": "",
+                    "adminremarks": "",
+                    "cancelrequest": 0
+                }
+
+                append_excel_rows(APPLICATION_FILE, [new_app])
+
+            elif action == "cancel":
+                if existing_app.empty:
+                    return jsonify(success=False, error="No booking found"), 404
+
+                idx = existing_app.index[0]
+                status = existing_app.iloc[0]["status"].lower()
+                key, rows = stored_row_keys(stored, [idx], APPLICATION_KEY)
+
+                if status == "pending":
+                    delete_excel_rows(APPLICATION_FILE, key, rows)
+                elif status == "approved":
+                    update_excel_rows(APPLICATION_FILE, key,
+                                      {rows[0]: {"cancelrequest": 1}})
+                else:
+                    return jsonify(success=False, error="Cannot cancel"), 400
 
-        required_cols = [
-            "timestamp", "id", "name", "month", "date", "day", "shiftperiod",
-            "shiftlevel", "status", "admindecision", "adminremarks",
-            "cancelrequest"
-        ]
-        for col in required_cols:
-            if col not in app_df.columns:
-                app_df[col] = ""
-
-        app_df["id"] = app_df["id"].astype(str)
-        app_df["date"] = pd.to_datetime(app_df["date"],
-                                        errors="coerce").dt.date
-
-        now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        app_df["timestamp"] = (app_df["timestamp"].astype(str).replace(
-            "nan", "").replace("", now_str).fillna(now_str))
-
-        existing_app = app_df[(app_df["id"] == sid)
-                              & (app_df["date"] == shift_date) &
-                              (app_df["shiftperiod"] == shift_period) &
-                              (app_df["shiftlevel"] == shift_level)]
-
-        if action == "book":
-            if not existing_app.empty:
-                return jsonify(success=False,
-                               error="You already booked this shift"), 400
-
-            new_app = {
-                "timestamp": now_str,
-                "id": sid,
-                "name": user["name"],
-                "month": shift_date.strftime("%Y-%m"),
-                "date": shift_date.strftime("%Y-%m-%d"),
-                "day": shift_date.strftime("%A"),
-                "shiftperiod": shift_period,
-                "shiftlevel": shift_level,
-                "status": "pending",
-                "admindecision": "",
-                "adminremarks": "",
-                "cancelrequest": 0
-            }
-
-            app_df = pd.concat([app_df, pd.DataFrame([new_app])],
-                               ignore_index=True)
-            save_excel_safe(app_df, APPLICATION_FILE)
-            recalculate_account_shift_totals()
-            return jsonify(success=True)
-
-        if action == "cancel":
-            if existing_app.empty:
-                return jsonify(success=False, error="No booking found"), 404
-
-            idx = existing_app.index[0]
-            status = existing_app.iloc[0]["status"].lower()
-
-            if status == "pending":
-                app_df = app_df.drop(idx)
-            elif status == "approved":
-                app_df.at[idx, "cancelrequest"] = 1
             else:
-                return jsonify(success=False, error="Cannot cancel"), 400
-
-            save_excel_safe(app_df, APPLICATION_FILE)
-            recalculate_account_shift_totals()
-            return jsonify(success=True)
+                return jsonify(success=False, error="Invalid action"), 400
 
-        return jsonify(success=False, error="Invalid action"), 400
+        # Totals are refreshed in the background, outside the file lock
+        account_totals.mark_dirty(sid)
+        return jsonify(success=True)
 
     except Exception as e:
         print("student_coach_shift_action ERROR:", e)
@@ -822,214 +766,128 @@ def safe_value(val):
     return "" if pd.isna(val) else str(val).strip()
 
 
-# Write approved shift to shift_record.xlsx
-def write_shift_record_if_not_exists(application_row):
-
-    # Load existing shift record
-    record_df = load_excel_safe(RECORD_FILE)
+# Write approved shifts to shift_record.xlsx
+def write_shift_records_if_not_exist(application_rows):
+    """Append a record for each application row that has none yet."""
+    if not application_rows:
+        return
 
-    # Normalize columns to lowercase and strip whitespace
-    record_df.columns = [c.strip().lower() for c in record_df.columns]
+    with excel_transaction(RECORD_FILE):
+        # Load existing shift record
+        record_df = load_excel_safe(RECORD_FILE)
 
-    # Define canonical columns
-    REQUIRED_COLUMNS = [
-        "indexshiftverify", "timestamp", "applicationtimestamp", "id", "name",
-        "month", "date", "day", "shiftperiod", "shiftlevel", "clockin",
-        "clockout", "remarks"
-    ]
+        # Normalize columns to lowercase and strip whitespace
+        record_df.columns = [c.strip().lower() for c in record_df.columns]
 
-    # Ensure all required columns exist
-    for col in REQUIRED_COLUMNS:
-        if col not in record_df.columns:
-            record_df[col] = ""
-
-    # Ensure types for comparison
-    record_df["id"] = record_df["id"].astype(str)
-    record_df["date"] = pd.to_datetime(record_df["date"], errors="coerce")
-    app_date = pd.to_datetime(application_row.get("date"), errors="coerce")
-
-    # Duplicate check
-    duplicate = record_df[(record_df["id"] == str(application_row.get("id")))
-                          & (record_df["date"] == app_date) &
-                          (record_df["shiftperiod"]
-                           == application_row.get("shiftperiod"))]
-    if not duplicate.empty:
-        return  # Already exists, do nothing
-
-    # Prepare new row
-    new_row = {
-        "indexshiftverify":
-        len(record_df) + 1,
-        "timestamp":
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "applicationtimestamp":
-        safe_value(application_row.get("timestamp"))
-        or safe_value(application_row.get("timestamp_str")),
-        "id":
-        str(application_row.get("id")),
-        "name":
-        application_row.get("name", ""),
-        "month":
-        application_row.get("month", ""),
-        "date":
-        app_date,
-        "day":
-        application_row.get("day", ""),
-        "shiftperiod":
-        application_row.get("shiftperiod", ""),
-        "shiftlevel":
-        application_row.get("shiftlevel", ""),
-        "clockin":
-        "",
-        "clockout":
-        "",
-        "remarks":
-        ""
-    }
+        # Define canonical columns
+        REQUIRED_COLUMNS = [
+            "indexshiftverify", "timestamp", "applicationtimestamp", "id", "name",
+            "month", "date", "day", "shiftperiod", "shiftlevel", "clockin",
+            "clockout", "remarks"
+        ]
 
-    # Append new row safely
-    record_df = pd.concat([record_df, pd.DataFrame([new_row])],
-                          ignore_index=True)
+        # Ensure all required columns exist
+        for col in REQUIRED_COLUMNS:
+            if col not in record_df.columns:
+                record_df[col] = ""
+
+        # (id, date, shiftperiod) of every record, for the duplicate check
+        existing = set(zip(record_df["id"].astype(str),
+                           pd.to_datetime(record_df["date"], errors="coerce"),
+                           record_df["shiftperiod"]))
+
+        new_rows = []
+        for application_row in application_rows:
+            app_date = pd.to_datetime(application_row.get("date"), errors="coerce")
+            ident = (str(application_row.get("id")), app_date,
+                     application_row.get("shiftperiod"))
+            if ident in existing:
+                continue  # Already exists, do nothing
+            existing.add(ident)
+
+            # Prepare new row
+            new_rows.append({
+                "indexshiftverify":
+                len(record_df) + len(new_rows) + 1,
+                "timestamp":
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "applicationtimestamp":
+                safe_value(application_row.get("timestamp"))
+                or safe_value(application_row.get("timestamp_str")),
+                "id":
+                str(application_row.get("id")),
+                "name":
+                application_row.get("name", ""),
+                "month":
+                application_row.get("month", ""),
+                "date":
+                app_date.strftime("%Y-%m-%d") if pd.notna(app_date) else "",
+                "day":
+                application_row.get("day", ""),
+                "shiftperiod":
+                application_row.get("shiftperiod", ""),
+                "shiftlevel":
+                application_row.get("shiftlevel", ""),
+                "clockin":
+                "",
+                "clockout":
+                "",
+                "remarks":
+                ""
+            })
 
-    # Save only canonical columns, in correct order
-    save_excel_safe(record_df[REQUIRED_COLUMNS], RECORD_FILE)
+        # Append the new rows without rewriting the existing records
+        append_excel_rows(RECORD_FILE, new_rows)
 
 
 # Admin shift application page
 @app.route("/admin/shift_application")
 def admin_shift_application():
-    # Load application data
-    app_df = load_excel_safe(APPLICATION_FILE)
+    # Totals shown on this page must include every pending change
+    account_totals.flush()
 
     # Current month/year or query params
     today = datetime.today()
     month = request.args.get("month", default=today.month, type=int)
     year = request.args.get("year", default=today.year, type=int)
 
-    # Flter application for current month only, app_df has a 'date' column of datetime
-    # Normalize columns FIRST
-    app_df.columns = app_df.columns.str.strip().str.lower()
-
-    # Convert date BEFORE using .dt
-    app_df["date"] = pd.to_datetime(app_df["date"], errors="coerce")
-
-    # Filter by month/year
-    month_apps = app_df[(app_df["date"].dt.month == month)
-                        & (app_df["date"].dt.year == year)]
-
-    calendar_data = {}
-    for _, row in month_apps.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
-        calendar_data.setdefault(date_str, []).append(row.to_dict())
-
-    def in_month(d):
-        return d.month == month
-
-    today = datetime.today()
     in_month = lambda d: d.month == month
 
     # Calendar month (Monday-first)
-    cal = calendar.Calendar(firstweekday=0)  # Monday=0
-    month_days = [week for week in cal.monthdatescalendar(year, month)]
-
-    if app_df.empty:
-        return render_template("admin_shift_application.html",
-                               application=[],
-                               calendar_data={},
-                               today=today.date(),
-                               month=month,
-                               year=year,
-                               month_days=month_days)
-
-    # --- Normalize columns ---
-    app_df.columns = app_df.columns.str.strip().str.lower()
-    app_df["id"] = app_df["id"].astype(str).str.strip()
-    app_df["date"] = pd.to_datetime(app_df["date"], errors="coerce")
-
-    # Ensure admin-related columns exist
-    for col in ["admindecision", "adminremarks", "status", "timestamp_str"]:
-        if col not in app_df.columns:
-            app_df[col] = ""
-
-    # Ensure columns exist but DO NOT modify values
-    for col in [
-            "admindecision", "adminremarks", "status", "timestamp_str",
-            "timestamp"
-    ]:
-        if col not in app_df.columns:
-            app_df[col] = ""
-
-    # Merge with account data for eligibility info
-    acc_df = load_excel_safe(ACCOUNT_FILE)
-    if not acc_df.empty:
-        acc_df.columns = acc_df.columns.str.strip()
-        acc_df["ID"] = acc_df["ID"].astype(str).str.strip()
+    month_days = month_grid(year, month)
 
-        # Ensure required account columns
-        for col in [
-                "onjobtrain", "nightShift", "totalApprovedShift",
-                "totalPendingShift"
-        ]:
-            if col not in acc_df.columns:
-                acc_df[col] = 0
-
-        # Merge application and account
-        app_df = app_df.merge(acc_df[[
-            "ID", "onjobtrain", "nightShift", "totalApprovedShift",
-            "totalPendingShift"
-        ]],
-                              left_on="id",
-                              right_on="ID",
-                              how="left")
-        app_df.drop(columns=["ID"], inplace=True, errors="ignore")
-
-    # Fill missing values
-    for col in [
-            "onjobtrain", "nightShift", "totalApprovedShift",
-            "totalPendingShift"
-    ]:
-        if col in app_df.columns:
-            app_df[col] = app_df[col].fillna(0).astype(int)
-
-    # Build calendar data dict
-    calendar_data = defaultdict(list)
-    for _, row in app_df.iterrows():
-        if pd.isna(row["date"]):
-            continue
-        date_str = row["date"].strftime("%Y-%m-%d")
-        calendar_data[date_str].append({
-            "id":
-            row["id"],
-            "name":
-            row["name"],
-            # "shift": row.get("shiftperiod") or row.get("shiftPeriod"),
-            "shift":
-            str(row.get("shiftperiod") or row.get("shiftPeriod")
-                or "").lower(),
-            "level":
-            row.get("shiftlevel") or row.get("shiftLevel"),
-            "admindecision":
-            row.get("admindecision", ""),
-            "status":
-            row.get("status", ""),
-            "onjobtrain":
-            row.get("onjobtrain", 0),
-            "nightShift":
-            row.get("nightShift", 0),
-            "adminremarks":
-            row.get("adminremarks", "")
-        })
+    # The table is fetched page by page from shift_application_data();
+    # the calendar only needs the days it shows
+    by_month = load_derived(APPLICATION_FILE, build_applications_by_month)
+    flags = load_derived(ACCOUNT_FILE, build_account_flags)
 
-    # convert timestamps BEFORE sending to template
-    app_df["timestamp_display"] = app_df["timestamp"].apply(
-        lambda x: ""
-        if pd.isna(x) else pd.to_datetime(x).strftime("%Y-%m-%d %H:%M:%S"))
+    first = month_days[0][0].strftime("%Y-%m-%d")
+    last = month_days[-1][-1].strftime("%Y-%m-%d")
+    shown_months = {(d.year, d.month) for d in (month_days[0][0], month_days[-1][-1])}
+    shown_months.add((year, month))
+
+    calendar_data = {}
+    for key in sorted(shown_months):
+        for row in by_month.get(key, []):
+            if not first <= row["date"] <= last:
+                continue
+            account = flags.get(row["id"], {})
+            calendar_data.setdefault(row["date"], []).append({
+                "id": row["id"],
+                "name": row["name"],
+                "shift": row["shiftperiod"].lower(),
+                "level": row["shiftlevel"],
+                "admindecision": row["admindecision"],
+                "status": row["status"],
+                "onjobtrain": account.get("onjobtrain", 0),
+                "nightShift": account.get("nightShift", 0),
+                "adminremarks": row["adminremarks"]
+            })
 
     return render_template("admin_shift_application.html",
                            user=session.get("user"),
-                           application=app_df.to_dict("records"),
                            calendar_data=calendar_data,
-                           today=today,
+                           today=today.date(),
                            month=month,
                            year=year,
                            month_days=month_days,
@@ -1038,31 +896,83 @@ def admin_shift_application():
                            in_month=in_month)
 
 
-# Admin shift application approve reject AJAX update
-@app.route("/admin/shift_application/update", methods=["POST"])
-def update_shift_application():
-    try:
-        # -----------------------------
-        # Get form data
-        # -----------------------------
-        timestamp = (request.form.get("timestamp") or "").strip()
-        key = (request.form.get("key") or "").strip()
-        admindecision = (request.form.get("admindecision") or "").strip()
-        adminremarks = (request.form.get("adminremarks") or "").strip()
-        status = (request.form.get("status") or "").strip()
-
-        if not key:
-            return jsonify(success=False, error="Missing key"), 400
+# Admin shift application table: one filtered page of one month as JSON
+@app.route("/admin/shift_application/data")
+def shift_application_data():
+    user = session.get("user")
+    if not user or user.get("role") != "admin":
+        return jsonify(success=False, error="Unauthorized"), 403
 
-        try:
-            id_, date_str, shift, level = key.split("_")
-        except ValueError:
-            return jsonify(success=False, error="Invalid key format"), 400
+    account_totals.flush()
 
-        # -----------------------------
-        # Load application file safely
-        # -----------------------------
-        app_df = load_excel_safe(APPLICATION_FILE)
+    today = datetime.today()
+    month = request.args.get("month", default=today.month, type=int)
+    year = request.args.get("year", default=today.year, type=int)
+    page = max(request.args.get("page", default=1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", default=50, type=int), 1), 500)
+
+    # Filters; blank means "all"
+    args = {k: (request.args.get(k) or "").strip().lower() for k in [
+        "student", "date", "shift", "level", "status", "decision", "ojt", "night"
+    ]}
+
+    by_month = load_derived(APPLICATION_FILE, build_applications_by_month)
+    flags = load_derived(ACCOUNT_FILE, build_account_flags)
+    no_account = {"onjobtrain": 0, "nightShift": 0,
+                  "totalApprovedShift": 0, "totalPendingShift": 0}
+
+    matched = []
+    for row in by_month.get((year, month), []):
+        account = flags.get(row["id"], no_account)
+        if args["student"] and args["student"] not in row["id"].lower() \
+                and args["student"] not in row["name"].lower():
+            continue
+        if args["date"] and row["date"] != args["date"]:
+            continue
+        if args["shift"] and row["shiftperiod"].lower() != args["shift"]:
+            continue
+        if args["level"] and row["shiftlevel"].lower() != args["level"]:
+            continue
+        if args["status"] and row["status"].lower() != args["status"]:
+            continue
+        if args["decision"] and row["admindecision"].lower() != args["decision"]:
+            continue
+        if args["ojt"] and str(account["onjobtrain"]) != args["ojt"]:
+            continue
+        if args["night"] and str(account["nightShift"]) != args["night"]:
+            continue
+        matched.append({**row, **account})
+
+    total = len(matched)
+    start = (page - 1) * per_page
+    return jsonify(success=True,
+                   rows=matched[start:start + per_page],
+                   total=total,
+                   page=page,
+                   per_page=per_page,
+                   pages=max((total + per_page - 1) // per_page, 1))
+
+
+# Admin shift application decisions, one or many per request
+def apply_admin_decisions(decisions, check=None):
+    """Apply decisions to shift_application.xlsx in one load/save.
+
+    decisions: [{"key", "admindecision", "status", "adminremarks",
+    "timestamp"}, ...]; "timestamp" is optional and adminremarks=None
+    leaves the remarks as they are. Totals and shift records are then
+    brought up to date once for the whole batch.
+
+    check(decisions), if given, runs under the application lock before
+    anything is written and returns the decisions that may still go ahead.
+
+    Returns (decided rows as dicts, keys that matched no application).
+    """
+    with excel_transaction(APPLICATION_FILE):
+        if check is not None:
+            decisions = check(decisions)
+
+        stored = load_excel_safe(APPLICATION_FILE)
+        app_df = stored.copy()
         app_df.columns = app_df.columns.str.strip().str.lower()
 
         # -----------------------------
@@ -1084,51 +994,101 @@ def update_shift_application():
         app_df["shiftlevel"] = app_df["shiftlevel"].astype(str).str.lower()
         app_df["timestamp_str"] = app_df["timestamp_str"].fillna("")
 
-        # -----------------------------
-        # Build row match (SAFE)
-        # -----------------------------
-        mask = None
+        # Rows of every key, found once instead of masking per decision
+        keys = (app_df["id"] + "_" + app_df["date"].dt.strftime("%Y-%m-%d") +
+                "_" + app_df["shiftperiod"] + "_" + app_df["shiftlevel"])
+        rows_by_key = {}
+        for idx, k in zip(app_df.index, keys):
+            rows_by_key.setdefault(k, []).append(idx)
 
-        timestamp = (request.form.get("timestamp") or "").strip()
+        now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        decided, missing = [], []
+        updates = {}
+
+        for d in decisions:
+            id_, date_str, shift, level = d["key"].split("_")
+
+            # Timestamp first (exact row), then the key
+            rows = []
+            if d.get("timestamp"):
+                rows = app_df.index[app_df["timestamp"].astype(str)
+                                    .str.startswith(d["timestamp"])].tolist()
+            if not rows:
+                rows = rows_by_key.get(
+                    f"{id_.strip()}_{date_str}_{shift.lower()}_{level.lower()}", [])
+            if not rows:
+                missing.append(d["key"])
+                continue
+
+            # -----------------------------
+            # Apply update (ONLY target rows)
+            # -----------------------------
+            values = {"admindecision": d["admindecision"],
+                      "status": d["status"],
+                      "adminupdatetimestamp": now_str}
+            if d.get("adminremarks") is not None:
+                values["adminremarks"] = d["adminremarks"]
+            for col, val in values.items():
+                app_df.loc[rows, col] = val
+            key, stored_keys = stored_row_keys(stored, rows, APPLICATION_KEY)
+            updates.update(dict.fromkeys(stored_keys, values))
+            decided.extend(rows)
+
+        # Only the decided rows are written
+        if updates:
+            update_excel_rows(APPLICATION_FILE, key, updates)
+
+    decided = app_df.loc[sorted(set(decided))]
 
-        if timestamp:
-            mask = (app_df["timestamp"].astype(str).str.startswith(timestamp))
+    # -----------------------------
+    # Recalculate totals (one batch)
+    # -----------------------------
+    account_totals.mark_dirty(*decided["id"].unique())
 
-        if mask is None or not mask.any():
-            mask = ((app_df["id"] == id_) &
-                    (app_df["date"].dt.strftime("%Y-%m-%d") == date_str) &
-                    (app_df["shiftperiod"] == shift.lower()) &
-                    (app_df["shiftlevel"] == level.lower()))
+    # -----------------------------
+    # Write approved records once
+    # -----------------------------
+    approved = decided[decided["admindecision"].astype(str).str.lower() == "approved"]
+    write_shift_records_if_not_exist(approved.to_dict("records"))
 
-        if not mask.any():
-            return jsonify(success=False, error="Application not found"), 404
+    # The static copy is only refreshed when rendered, so do it now
+    if duty_calendar_pages.static_dir:
+        today = datetime.now(pytz.timezone("Asia/Singapore")).date()
+        for year, month in set(zip(decided["date"].dt.year.dropna().astype(int),
+                                   decided["date"].dt.month.dropna().astype(int))):
+            duty_calendar_snapshot(year, month, today)
 
-        # -----------------------------
-        # Apply update (ONLY target row)
-        # -----------------------------
-        now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return decided.to_dict("records"), missing
 
-        app_df.loc[mask, "admindecision"] = admindecision
-        app_df.loc[mask, "adminremarks"] = adminremarks
-        app_df.loc[mask, "status"] = status
-        app_df.loc[mask, "adminupdatetimestamp"] = now_str
 
+# Admin shift application approve reject AJAX update
+@app.route("/admin/shift_application/update", methods=["POST"])
+def update_shift_application():
+    try:
         # -----------------------------
-        # Save safely
+        # Get form data
         # -----------------------------
-        save_excel_safe(app_df, APPLICATION_FILE)
+        timestamp = (request.form.get("timestamp") or "").strip()
+        key = (request.form.get("key") or "").strip()
+        admindecision = (request.form.get("admindecision") or "").strip()
+        adminremarks = (request.form.get("adminremarks") or "").strip()
+        status = (request.form.get("status") or "").strip()
 
-        # -----------------------------
-        # Recalculate totals
-        # -----------------------------
-        recalculate_account_shift_totals()
+        if not key:
+            return jsonify(success=False, error="Missing key"), 400
 
-        # -----------------------------
-        # Write approved record once
-        # -----------------------------
-        if admindecision.lower() == "approved":
-            write_shift_record_if_not_exists(
-                app_df.loc[mask].iloc[0].to_dict())
+        if len(key.split("_")) != 4:
+            return jsonify(success=False, error="Invalid key format"), 400
+
+        decided, _ = apply_admin_decisions([{
+            "key": key,
+            "timestamp": timestamp,
+            "admindecision": admindecision,
+            "status": status,
+            "adminremarks": adminremarks
+        }])
+        if not decided:
+            return jsonify(success=False, error="Application not found"), 404
 
         return jsonify(success=True,
                        message="Application updated successfully")
@@ -1138,6 +1098,123 @@ def update_shift_application():
         return jsonify(success=False, error="Internal server error"), 500
 
 
+# Admin bulk approve / reject AJAX update
+@app.route("/admin/shift_application/batch_update", methods=["POST"])
+def batch_update_shift_application():
+    user = session.get("user")
+    if not user or user.get("role") != "admin":
+        return jsonify(success=False, error="Unauthorized"), 403
+
+    data = request.get_json(silent=True) or {}
+    keys = [str(k).strip() for k in data.get("keys") or [] if str(k).strip()]
+    admindecision = (data.get("admindecision") or "").strip()
+    status = (data.get("status") or admindecision).strip()
+    adminremarks = data.get("adminremarks")
+
+    if not keys or not admindecision:
+        return jsonify(success=False, error="Missing keys or decision"), 400
+
+    bad = [k for k in keys if len(k.split("_")) != 4]
+    if bad:
+        return jsonify(success=False, error=f"Invalid key format: {bad[0]}"), 400
+
+    keys = list(dict.fromkeys(keys))
+    try:
+        decided, missing = apply_admin_decisions([{
+            "key": k,
+            "admindecision": admindecision,
+            "status": status,
+            "adminremarks": (adminremarks.strip()
+                             if isinstance(adminremarks, str) else None)
+        } for k in keys])
+    except Exception as e:
+        print("batch_update_shift_application ERROR:", e)
+        return jsonify(success=False, error="Internal server error"), 500
+
+    if not decided:
+        return jsonify(success=False, error="Application not found"), 404
+
+    return jsonify(success=True,
+                   updated=len(decided),
+                   missing=missing,
+                   message=f"{len(keys) - len(missing)} applications updated")
+
+
+# Admin auto-allocation of open slots to pending applications
+# How many coaches one slot takes
+SLOT_CAPACITY = int(os.environ.get("SLOT_CAPACITY", 2))
+
+
+def allocate_month(year, month):
+    """propose_allocation() for a month, on the current data."""
+    return propose_allocation(
+        load_excel_safe(SLOT_FILE),
+        load_excel_safe(APPLICATION_FILE),
+        load_derived(ACCOUNT_FILE, build_account_flags),
+        year, month, SLOT_CAPACITY)
+
+
+@app.route("/admin/shift_application/allocate/preview")
+def allocate_preview():
+    user = session.get("user")
+    if not user or user.get("role") != "admin":
+        return jsonify(success=False, error="Unauthorized"), 403
+
+    today = datetime.today()
+    month = request.args.get("month", default=today.month, type=int)
+    year = request.args.get("year", default=today.year, type=int)
+
+    assignments, summary = allocate_month(year, month)
+    return jsonify(success=True, assignments=assignments, **summary)
+
+
+@app.route("/admin/shift_application/allocate/apply", methods=["POST"])
+def allocate_apply():
+    user = session.get("user")
+    if not user or user.get("role") != "admin":
+        return jsonify(success=False, error="Unauthorized"), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        month = int(data.get("month"))
+        year = int(data.get("year"))
+    except (TypeError, ValueError):
+        return jsonify(success=False, error="Missing month or year"), 400
+    keys = [str(k).strip() for k in data.get("keys") or [] if str(k).strip()]
+    if not keys:
+        return jsonify(success=False, error="Nothing to approve"), 400
+
+    # Exactly what the admin previewed, minus whatever changed since:
+    # checked again under the application lock, so nothing approved in
+    # the meantime gets overbooked
+    stale = []
+
+    def still_valid(decisions):
+        valid, gone = check_allocation(
+            load_excel_safe(SLOT_FILE),
+            load_excel_safe(APPLICATION_FILE),
+            load_derived(ACCOUNT_FILE, build_account_flags),
+            year, month, SLOT_CAPACITY, [d["key"] for d in decisions])
+        stale.extend(gone)
+        valid = set(valid)
+        return [d for d in decisions if d["key"] in valid]
+
+    try:
+        decided, missing = apply_admin_decisions([{
+            "key": k,
+            "admindecision": "approved",
+            "status": "approved",
+            "adminremarks": None
+        } for k in dict.fromkeys(keys)], check=still_valid)
+    except Exception as e:
+        print("allocate_apply ERROR:", e)
+        return jsonify(success=False, error="Internal server error"), 500
+
+    return jsonify(success=True,
+                   updated=len(decided),
+                   stale=stale + missing)
+
+
 # Student coach attendance page
 SG_TZ = ZoneInfo("Asia/Singapore")
 
@@ -1145,14 +1222,8 @@ SG_TZ = ZoneInfo("Asia/Singapore")
 def now_sg():
     return datetime.now(SG_TZ).strftime("%Y-%m-%d %H:%M:%S")
 
-def load_excel_safe(file):
-    try:
-        return pd.read_excel(file)
-    except Exception:
-        return pd.DataFrame()
-
-def save_excel_safe(df, file):
-    df.to_excel(file, index=False)
+# Clock-in/out events, appended by student_clock_action
+clock_events = AppendIndex(ATTENDANCE_FILE, build_clock_events, add_clock_event)
 
 # -------------------- Attendance Page --------------------
 @app.route("/student/attendance")
@@ -1185,10 +1256,18 @@ def student_attendance():
     if "shifthours" not in my_shifts.columns:
         my_shifts["shifthours"] = ""
 
+    # Clock times live in the attendance event log; merge them in
+    shifts = my_shifts.to_dict("records")
+    events = clock_events.get()
+    for s in shifts:
+        key = shift_key(sid, pd.to_datetime(s["date"], errors="coerce").date(),
+                        s["shiftperiod"], s["shiftlevel"])
+        s.update(merge_clock_times(s, events.get(key, {})))
+
     return render_template(
         "student_attendance.html",
         user=user,
-        shifts=my_shifts.to_dict("records"),
+        shifts=shifts,
         now_time=now_sg()
     )
 
@@ -1211,41 +1290,46 @@ def student_clock_action():
     except ValueError:
         return jsonify(success=False, error="Bad key"), 200
 
-    df = load_excel_safe(RECORD_FILE)
-    df.columns = df.columns.str.strip().str.lower()
-    df["id"] = df["id"].astype(str)
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
-
-    for col in ["clockin","clockout"]:
-        df[col] = df[col].fillna("").astype(str).str.strip()
-
-    mask = (
-        (df["id"] == sid) &
-        (df["date"] == date_str) &
-        (df["shiftperiod"].str.strip().str.lower() == shift.strip().lower()) &
-        (df["shiftlevel"].str.strip().str.lower() == level.strip().lower())
-    )
-
-    if not mask.any():
+    shift_day = pd.to_datetime(date_str, errors="coerce")
+    if pd.isna(shift_day):
+        return jsonify(success=False, error="Shift not found"), 200
+    shift_day = shift_day.date()
+    target = shift_key(sid, shift_day, shift, level)
+
+    # The records are only read (from the cache); the clock time is
+    # appended to the small event log, so a whole shift clocking in at once
+    # does not queue up behind rewrites of shift_record.xlsx
+    record_times = load_derived(RECORD_FILE, build_record_clock_times)
+    if target not in record_times:
         return jsonify(success=False, error="Shift not found"), 200
 
-    now_time = now_sg()
+    with excel_transaction(ATTENDANCE_FILE):
+        times = merge_clock_times(record_times[target],
+                                  clock_events.get().get(target, {}))
+        now_time = now_sg()
 
-    if action == "clockin":
-        if df.loc[mask,"clockin"].iloc[0] == "":
-            df.loc[mask,"clockin"] = now_time
-        else:
-            now_time = df.loc[mask,"clockin"].iloc[0]
+        if action == "clockin":
+            if times["clockin"]:
+                return jsonify(success=True, time=times["clockin"])
 
-    elif action == "clockout":
-        if df.loc[mask,"clockin"].iloc[0] == "":
-            return jsonify(success=False, error="Clock in first"), 200
-        if df.loc[mask,"clockout"].iloc[0] == "":
-            df.loc[mask,"clockout"] = now_time
-        else:
-            now_time = df.loc[mask,"clockout"].iloc[0]
+        elif action == "clockout":
+            if not times["clockin"]:
+                return jsonify(success=False, error="Clock in first"), 200
+            if times["clockout"]:
+                return jsonify(success=True, time=times["clockout"])
 
-    save_excel_safe(df, RECORD_FILE)
+        else:
+            return jsonify(success=False, error="Unknown action"), 200
+
+        clock_events.append([{
+            "timestamp": now_time,
+            "id": sid,
+            "date": shift_day.strftime("%Y-%m-%d"),
+            "shiftperiod": shift,
+            "shiftlevel": level,
+            "action": action,
+            "time": now_time
+        }])
     return jsonify(success=True, time=now_time)
 
 # -------------------- Save Attendance --------------------
@@ -1270,34 +1354,36 @@ def student_attendance_save():
         return jsonify(success=False, error="Invalid key format"), 400
     _, date_str, shift, level = parts
 
-    df = load_excel_safe(RECORD_FILE)
-    df.columns = df.columns.str.strip().str.lower()
-    df["id"] = df["id"].astype(str)
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
-
-    mask = (
-        (df["id"]==sid) &
-        (df["date"]==date_str) &
-        (df["shiftperiod"].astype(str).str.lower()==shift.lower()) &
-        (df["shiftlevel"].astype(str).str.lower()==level.lower())
-    )
-    if not mask.any():
-        return jsonify(success=False, error="Shift not found"), 404
-
-    for col, val in [("shiftstart", shiftstart), ("shiftend", shiftend), ("remarks", remarks)]:
-        df.loc[mask, col] = val
-
-    # Auto-calc hours
-    if shiftstart and shiftend:
-        try:
-            start = datetime.strptime(shiftstart,"%H:%M")
-            end = datetime.strptime(shiftend,"%H:%M")
-            if end>start:
-                df.loc[mask,"shifthours"] = round((end-start).seconds/3600,2)
-        except:
-            pass
-
-    save_excel_safe(df, RECORD_FILE)
+    with excel_transaction(RECORD_FILE):
+        stored = load_excel_safe(RECORD_FILE)
+        df = stored.copy()
+        df.columns = df.columns.str.strip().str.lower()
+        df["id"] = df["id"].astype(str)
+        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+
+        mask = (
+            (df["id"]==sid) &
+            (df["date"]==date_str) &
+            (df["shiftperiod"].astype(str).str.lower()==shift.lower()) &
+            (df["shiftlevel"].astype(str).str.lower()==level.lower())
+        )
+        if not mask.any():
+            return jsonify(success=False, error="Shift not found"), 404
+
+        values = {"shiftstart": shiftstart, "shiftend": shiftend, "remarks": remarks}
+
+        # Auto-calc hours
+        if shiftstart and shiftend:
+            try:
+                start = datetime.strptime(shiftstart,"%H:%M")
+                end = datetime.strptime(shiftend,"%H:%M")
+                if end>start:
+                    values["shifthours"] = round((end-start).seconds/3600,2)
+            except:
+                pass
+
+        key, rows = stored_row_keys(stored, mask, RECORD_KEY)
+        update_excel_rows(RECORD_FILE, key, dict.fromkeys(rows, values))
     return jsonify(success=True)
 
 # Admin verify student coach shift
@@ -1305,6 +1391,9 @@ SG_TZ = ZoneInfo("Asia/Singapore")
 def now_sg():
     return datetime.now(SG_TZ).strftime("%Y-%m-%d %H:%M:%S")
 
+# Verified shifts; the save route adds to it, so GETs never re-read the file
+verified_keys = AppendIndex(VERIFY_FILE, build_verified_keys, add_verified_key)
+
 # Admin AJAX verify and save sign
 @app.route("/admin/verify_shifts")
 def admin_verify_shifts():
@@ -1312,37 +1401,43 @@ def admin_verify_shifts():
     if not user or user.get("role") != "admin":
         return redirect(url_for("admin_login"))
 
-    rec_df = load_excel_safe(RECORD_FILE)
-    if rec_df.empty:
-        shifts = []
-    else:
-        rec_df.columns = rec_df.columns.str.strip().str.lower()
-        rec_df["date"] = pd.to_datetime(rec_df["date"], errors="coerce")
-
-        # Sort by date ascending
-        rec_df = rec_df.sort_values(by="date", ascending=True)
-
-        # Merge verification info
-        verify_df = load_excel_safe(VERIFY_FILE)
-        if not verify_df.empty:
-            verify_df.columns = verify_df.columns.str.strip().str.lower()
-            # Create set of verified keys
-            verified_keys = set(
-                f"{row['studentcoachid']}_{row['date']}_{row['shiftperiod']}_{row['shiftlevel']}"
-                for idx, row in verify_df.iterrows())
-            rec_df["is_verified"] = rec_df.apply(
-                lambda r:
-                f"{r['id']}_{r['date'].strftime('%Y-%m-%d')}_{r['shiftperiod']}_{r['shiftlevel']}"
-                in verified_keys,
-                axis=1)
-        else:
-            rec_df["is_verified"] = False
-
-        shifts = rec_df.to_dict("records")
+    today = datetime.today()
+    month = request.args.get("month", default=today.month, type=int)
+    year = request.args.get("year", default=today.year, type=int)
+    student = (request.args.get("student") or "").strip()
+    page = max(request.args.get("page", default=1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", default=50, type=int), 1), 500)
+
+    # Records of the month, already sorted by date
+    rows = load_derived(RECORD_FILE, build_records_by_month).get((year, month), [])
+    if student:
+        needle = student.lower()
+        rows = [r for r in rows
+                if needle in r["id"].lower() or needle in r["name"].lower()]
+
+    total = len(rows)
+    pages = max((total + per_page - 1) // per_page, 1)
+    page = min(page, pages)
+    start = (page - 1) * per_page
+
+    # Merge clock times and verification info, for the shown page only
+    events = clock_events.get()
+    verified = verified_keys.get()
+    shifts = [{**r, **merge_clock_times(r, events.get(r["shift_key"], {})),
+               "is_verified": r["shift_key"] in verified}
+              for r in rows[start:start + per_page]]
 
     return render_template("admin_verify_shifts.html",
                            user=user,
                            shifts=shifts,
+                           month=month,
+                           year=year,
+                           student=student,
+                           page=page,
+                           pages=pages,
+                           per_page=per_page,
+                           total=total,
+                           first=start + 1 if total else 0,
                            now_sg=now_sg())
 
 
@@ -1385,7 +1480,11 @@ def admin_verify_shift_save():
     if not mask.any():
         return jsonify(success=False, error="Shift not found"), 404
 
-    row = rec_df.loc[mask].iloc[0]
+    row = rec_df.loc[mask].iloc[0].to_dict()
+    target = shift_key(sid, pd.to_datetime(date_str).date(), shift, level)
+    row.update(merge_clock_times(
+        {a: "" if pd.isna(row.get(a)) else row.get(a) for a in ("clockin", "clockout")},
+        clock_events.get().get(target, {})))
 
     # ---------- SIGNATURE ----------
     os.makedirs("static/signatures", exist_ok=True)
@@ -1413,112 +1512,76 @@ def admin_verify_shift_save():
     else:
         return jsonify(success=False, error="Signature required"), 400
 
-    verify_df = load_excel_safe(VERIFY_FILE)
-
-    if verify_df.empty:
-        verify_df = pd.DataFrame(columns=[
-            "indexshiftrecord", "timestamp", "month", "date", "day",
-            "shiftperiod", "shiftlevel", "studentcoachid", "studentcoachname",
-            "clockin", "clockout", "shiftstart", "shiftend", "shifthour",
-            "staffname", "staffsign", "staffremarks"
-        ])
-    else:
-        verify_df.columns = verify_df.columns.str.strip().str.lower()
-
-    verify_df.loc[len(verify_df)] = {
-        "indexshiftrecord": len(verify_df) + 1,
-        "timestamp": now_sg(),
-        "month": row.get("month", ""),
-        "date": row.get("date", ""),
-        "day": row.get("day", ""),
-        "shiftperiod": row.get("shiftperiod", ""),
-        "shiftlevel": row.get("shiftlevel", ""),
-        "studentcoachid": row.get("id", ""),
-        "studentcoachname": row.get("name", ""),
-        "clockin": row.get("clockin", ""),
-        "clockout": row.get("clockout", ""),
-        "shiftstart": row.get("shiftstart", ""),
-        "shiftend": row.get("shiftend", ""),
-        "shifthour": row.get("shifthour", ""),
-        "staffname": staffname,
-        "staffsign": sign_filename,
-        "staffremarks": remarks
-    }
+    with excel_transaction(VERIFY_FILE):
+        verify_df = load_excel_safe(VERIFY_FILE)
 
-    save_excel_safe(verify_df, VERIFY_FILE)
+        verified_keys.append([{
+            "indexshiftrecord": len(verify_df) + 1,
+            "timestamp": now_sg(),
+            "month": row.get("month", ""),
+            "date": row.get("date", ""),
+            "day": row.get("day", ""),
+            "shiftperiod": row.get("shiftperiod", ""),
+            "shiftlevel": row.get("shiftlevel", ""),
+            "studentcoachid": row.get("id", ""),
+            "studentcoachname": row.get("name", ""),
+            "clockin": row.get("clockin", ""),
+            "clockout": row.get("clockout", ""),
+            "shiftstart": row.get("shiftstart", ""),
+            "shiftend": row.get("shiftend", ""),
+            "shifthour": row.get("shifthour", ""),
+            "staffname": staffname,
+            "staffsign": sign_filename,
+            "staffremarks": remarks
+        }])
 
     return jsonify(success=True)
 
 
 # Projecthub duty calendar
+# Rendered once per month and data version. Set PROJECTHUB_STATIC_DIR (e.g.
+# static/projecthub) to also keep a plain HTML copy of every month there
+duty_calendar_pages = PageSnapshots(
+    static_dir=os.environ.get("PROJECTHUB_STATIC_DIR") or None)
+
+
+def duty_calendar_snapshot(year, month, today):
+    # Signature first: a write racing with the load then re-renders next time
+    version = (workbook_cache.backend.signature(APPLICATION_FILE), today)
+    by_month = load_derived(APPLICATION_FILE, build_approved_by_month)
+
+    def render():
+        return render_template(
+            "projecthub_duty_calendar.html",
+            month=month,
+            year=year,
+            month_days=month_grid(year, month),
+            shifts_per_date=by_month.get((year, month), {}),  # empty is OK
+            today=today)
+
+    return duty_calendar_pages.get(
+        (year, month), version, render,
+        filename=f"duty_calendar_{year}_{month:02d}.html")
+
+
 @app.route("/projecthub_duty_calendar")
 def projecthub_duty_calendar():
     # Set Singapore timezone
     sg_tz = pytz.timezone("Asia/Singapore")
     today = datetime.now(sg_tz).date()  # only the date part
 
-    # ------------------------------
-    # Date / navigation setup
-    # ------------------------------
     month = request.args.get("month", today.month, type=int)
     year = request.args.get("year", today.year, type=int)
 
-    # Monday-first calendar
-    cal = calendar.Calendar(firstweekday=calendar.MONDAY)
-    month_days = cal.monthdatescalendar(year, month)
-
-    # ------------------------------
-    # Load application data safely
-    # ------------------------------
-    df = load_excel_safe(APPLICATION_FILE)
-
-    shifts_per_date = defaultdict(list)
-
-    if not df.empty:
-        # Normalize columns
-        df.columns = df.columns.str.strip()
-
-        # Ensure required columns exist (never break old files)
-        for col in [
-                "admindecision", "date", "name", "shiftperiod", "shiftlevel",
-                "adminremarks"
-        ]:
-            if col not in df.columns:
-                df[col] = ""
-
-        # Approved only (case-insensitive)
-        df["admindecision"] = df["admindecision"].astype(str).str.lower()
-        df = df[df["admindecision"] == "approved"]
-
-        # Parse dates safely
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date"])
-
-        # Build calendar data
-        for _, row in df.iterrows():
-            date_str = row["date"].strftime("%Y-%m-%d")
-
-            shifts_per_date[date_str].append({
-                "name":
-                str(row["name"]),
-                "shiftperiod":
-                str(row["shiftperiod"]).lower(),
-                "shiftlevel":
-                str(row["shiftlevel"]).lower(),
-                "adminremarks":
-                str(row.get("adminremarks", ""))
-            })
+    snapshot = duty_calendar_snapshot(year, month, today)
 
-    # ------------------------------
-    # ALWAYS render calendar
-    # ------------------------------
-    return render_template(
-        "projecthub_duty_calendar.html",
-        month=month,
-        year=year,
-        month_days=month_days,
-        shifts_per_date=shifts_per_date,  # empty dict is OK
-        today=today)
+    # Clients revalidate every time and usually get a bodiless 304
+    response = app.response_class(snapshot.body, mimetype="text/html")
+    response.set_etag(snapshot.etag)
+    response.last_modified = snapshot.last_modified
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 # Mange excel file
@@ -1529,6 +1592,7 @@ ALLOWED_EXCEL_FILES = {
     "shift_application.xlsx",
     "shift_record.xlsx",
     "shift_verify.xlsx",
+    "attendance_events.xlsx",
 }
 
 
@@ -1592,10 +1656,15 @@ def admin_upload_excel():
     save_path = os.path.join(DATA_FOLDER, filename)
 
     try:
-        file.save(save_path)
+        with excel_transaction(save_path):
+            file.save(save_path)
+            # Non-Excel backends take the workbook in as their new contents
+            get_backend().import_file(save_path)
         flash(f"{filename} uploaded successfully", "success")
     except Exception as e:
         flash(f"Upload failed: {e}", "error")
+    finally:
+        workbook_cache.invalidate(save_path)
 
     return redirect(url_for("admin_manage_excels"))
 
@@ -1619,6 +1688,20 @@ def admin_download_excel(filename):
 
     file_path = os.path.join(DATA_FOLDER, filename)
 
+    # Refresh the workbook from non-Excel backends before sending it
+    try:
+        with excel_transaction(file_path):
+            if file_path == RECORD_FILE:
+                # Clock times are kept in the event log; put them in the
+                # records so the download has them
+                rec_df, filled = fold_clock_events(
+                    load_excel_safe(RECORD_FILE), clock_events.get())
+                if filled:
+                    save_excel_safe(rec_df, RECORD_FILE)
+            get_backend().export_file(file_path)
+    except Exception as e:
+        print(f"[admin_download_excel] Export of {filename} failed: {e}")
+
     if not os.path.exists(file_path):
         flash("File not found", "error")
         return redirect(url_for("admin_manage_excels"))
@@ -1637,6 +1720,13 @@ def admin_download_excel(filename):
 # Flask app for Replit
 # ==========================
 # Health Check for UptimeRobot
+# Never touches the data, so it answers as soon as the app is imported;
+# /health?details=1 adds the startup-time report
 @app.route("/health")
 def health():
+    if request.args.get("details"):
+        return jsonify(startup.report())
     return "UptimeRobot ok."
+
+
+startup.mark("web app")